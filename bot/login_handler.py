@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 
@@ -7,6 +8,7 @@ from telegram.ext import ContextTypes
 from core.db import insert
 from core.models.command_config import CommandConfig
 from core.models.users import create_user, select_user, exist
+from services.circuit_breaker import LMS_UNAVAILABLE, LmsUnavailableError
 from services.scraper import Scraper
 from utils.check_utils import available_or_message, measure_duration
 
@@ -24,6 +26,7 @@ def login(encryptor):
         insert("data", {
             "type": "command",
             "command": "login",
+            "user_id": update.effective_user.id,
             "timestamp": time.time()
         })
         cfg = CommandConfig.get("login")
@@ -38,7 +41,13 @@ def login(encryptor):
 
         try:
             scraper: Scraper = context.bot_data["scraper"]
-            scraper.login(scraper.init_driver(False), login_name, pwd)
+            await asyncio.to_thread(
+                scraper.run, "login", lambda client: scraper.login(client, login_name, pwd, reuse_session=False)
+            )
+        except LmsUnavailableError:
+            # Не выдаём лежащую LMS за неверный пароль
+            await status_msg.edit_text(cfg.get_message("lms_unavailable") or LMS_UNAVAILABLE)
+            return
         except Exception:
             await status_msg.edit_text(cfg.get_message("incorrect_data"))
             return
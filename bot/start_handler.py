@@ -20,6 +20,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     insert("data", {
         "type": "command",
         "command": "start",
+        "user_id": update.effective_user.id,
         "timestamp": time.time()
     })
     cfg = CommandConfig.get("start")
@@ -7,8 +7,9 @@ from telegram.ext import ContextTypes
 
 from core.db import insert
 from core.models.command_config import CommandConfig
-from core.models.tasks import create_tasks_bulk
+from core.models.tasks import create_tasks_bulk, custom_select as task_select
 from core.models.users import select_user
+from services.circuit_breaker import LMS_UNAVAILABLE, LmsUnavailableError
 from utils.check_utils import available_or_message, measure_duration
 from utils.date_utils import short_date, compact_time
 from utils.status_utils import status_emoji
@@ -18,7 +19,7 @@ logger = logging.getLogger(__name__)
 
 def get_tasks(settings, encryptor, scraper):
     """
-    /get_tasks — асинхронный сбор заданий через Selenium, запись в БД и вывод в чат.
+    /get_tasks — асинхронный сбор заданий из LMS, запись в БД и вывод в чат.
     """
 
     @available_or_message
@@ -34,28 +35,29 @@ def get_tasks(settings, encryptor, scraper):
         insert("data", {
             "type": "command",
             "command": "get_tasks",
+            "user_id": tg_id,
             "timestamp": time.time()
         })
         pwd = encryptor.decrypt(user.mtuci_password)
 
         status_msg = await update.message.reply_text(cfg.get_message("get_tasks_data"))
 
-        def fetch_assignments():
-            driver = scraper.init_driver()
-            try:
-                scraper.login(driver, user.mtuci_login, pwd)
-                by_course: dict[str, list[list[str]]] = {}
-                for link in scraper.get_course_links(driver):
-                    raws = scraper.parse_assignments_from_course(driver, link)
-                    for item in raws:
-                        course = item[0]
-                        by_course.setdefault(course, []).append(item)
-                return by_course
-            finally:
-                scraper.quit_and_clear(driver)
+        def fetch_assignments(client):
+            scraper.login(client, user.mtuci_login, pwd)
+            known = {t.task_link: t for t in task_select({"user_id": tg_id})}
+            by_course: dict[str, list[list]] = {}
+            for link in scraper.courses.get(user, client):
+                raws = scraper.parse_assignments_from_course(client, link, known)
+                for item in raws:
+                    course = item[0]
+                    by_course.setdefault(course, []).append(item)
+            return by_course
 
         try:
-            assignments_by_course = await asyncio.to_thread(fetch_assignments)
+            assignments_by_course = await asyncio.to_thread(scraper.run, "tasks", fetch_assignments)
+        except LmsUnavailableError:
+            await status_msg.edit_text(cfg.get_message("lms_unavailable") or LMS_UNAVAILABLE)
+            return
         except Exception:
             assignments_by_course = None
 
@@ -76,7 +78,9 @@ def get_tasks(settings, encryptor, scraper):
                     "response_status": item[5],
                     "grade_status": item[6],
                     "time_left": compact_time(item[7]),
-                    "last_change": item[8]
+                    "last_change": item[8],
+                    "course_link": item[10],
+                    "index_status": item[11]
                 })
 
         create_tasks_bulk(tg_id, tasks_data)
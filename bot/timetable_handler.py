@@ -9,6 +9,7 @@ from telegram.ext import ContextTypes
 from core.db import insert
 from core.models.command_config import CommandConfig
 from core.models.users import select_user
+from services.circuit_breaker import LMS_UNAVAILABLE, LmsUnavailableError
 from utils.check_utils import available_or_message, measure_duration
 
 logger = logging.getLogger(__name__)
@@ -32,24 +33,18 @@ def get_timetable(settings, encryptor, scraper):
         insert("data", {
             "type": "command",
             "command": "get_timetable",
+            "user_id": tg_id,
             "timestamp": time.time()
         })
 
         status_msg = await update.message.reply_text(cfg.get_message("get_timetable_data"))
 
-        def _fetch():
-            driver = scraper.init_driver()
-            try:
-                return scraper.get_timetable(
-                    driver,
-                    user.mtuci_login,
-                    encryptor.decrypt(user.mtuci_password)
-                )
-            finally:
-                scraper.quit_and_clear(driver)
-
+        # Расписание общее для группы: обычно отдаётся из кеша, LMS дёргается только при промахе
         try:
-            entries = await asyncio.to_thread(_fetch)
+            entries = await asyncio.to_thread(scraper.timetables.get, user)
+        except LmsUnavailableError:
+            await status_msg.edit_text(cfg.get_message("lms_unavailable") or LMS_UNAVAILABLE)
+            return
         except Exception:
             await status_msg.edit_text(cfg.get_message("error_collecting_data"))
             return
@@ -0,0 +1,36 @@
+import time
+
+from core.db import get_collection
+
+collection_name = "groups_catalog"
+
+
+def _coll():
+    return get_collection(collection_name)
+
+
+def save_groups(level: str, form: str, faculty: str, course: str, groups: list[str]) -> None:
+    _coll().update_one(
+        {"level": level, "form": form, "faculty": faculty, "course": course},
+        {"$set": {
+            "level": level,
+            "form": form,
+            "faculty": faculty,
+            "course": course,
+            "groups": groups,
+            "updated_at": time.time(),
+        }},
+        upsert=True
+    )
+
+
+def get_catalog() -> dict:
+    """
+    Весь каталог в форме COURSES_MAP: {уровень: {форма: {факультет: {курс: [группы]}}}}.
+    """
+    catalog = {}
+    for doc in _coll().find({}):
+        (catalog.setdefault(doc["level"], {})
+                .setdefault(doc["form"], {})
+                .setdefault(doc["faculty"], {}))[doc["course"]] = doc.get("groups", [])
+    return catalog
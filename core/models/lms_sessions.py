@@ -0,0 +1,54 @@
+import time
+from typing import Optional
+
+from core.db import get_collection
+
+collection_name = "lms_sessions"
+
+
+def _coll():
+    return get_collection(collection_name)
+
+
+def get_session(mtuci_login: str) -> Optional[str]:
+    """
+    Зашифрованные куки LMS пользователя или None, если их нет или срок истёк.
+    """
+    doc = _coll().find_one({"mtuci_login": mtuci_login})
+    if not doc or doc.get("expires_at", 0) <= time.time():
+        return None
+    return doc.get("cookies")
+
+
+def save_session(mtuci_login: str, cookies: str, expires_at: float) -> None:
+    _coll().update_one(
+        {"mtuci_login": mtuci_login},
+        {"$set": {
+            "mtuci_login": mtuci_login,
+            "cookies": cookies,
+            "expires_at": expires_at,
+            "saved_at": time.time(),
+        }},
+        upsert=True
+    )
+
+
+def drop_session(mtuci_login: str) -> None:
+    _coll().delete_one({"mtuci_login": mtuci_login})
+
+
+def get_timetable_request(mtuci_login: str) -> Optional[dict]:
+    """
+    Запрос getProcessor, пойманный в браузере, вместе с сессией, к которой он относится.
+    """
+    doc = _coll().find_one({"mtuci_login": mtuci_login})
+    if not doc or doc.get("expires_at", 0) <= time.time():
+        return None
+    return doc.get("timetable_request")
+
+
+def save_timetable_request(mtuci_login: str, request: dict) -> None:
+    _coll().update_one(
+        {"mtuci_login": mtuci_login},
+        {"$set": {"timetable_request": request}}
+    )
@@ -22,6 +22,10 @@ class Task:
         self._time_left = task.get("time_left", "")
         self._last_change = task.get("last_change", "")
         self._last_updated = task.get("last_updated", 0)
+        self._course_link = task.get("course_link", "")
+        self._index_status = task.get("index_status", "")
+        self._status_fingerprint = task.get("status_fingerprint", "")
+        self._next_check_at = task.get("next_check_at", 0)
 
     @property
     def uuid(self): return self._uuid
@@ -59,6 +63,18 @@ class Task:
     @property
     def last_updated(self): return self._last_updated
 
+    @property
+    def course_link(self): return self._course_link
+
+    @property
+    def index_status(self): return self._index_status
+
+    @property
+    def status_fingerprint(self): return self._status_fingerprint
+
+    @property
+    def next_check_at(self): return self._next_check_at
+
     @user_id.setter
     def user_id(self, value):
         self._user_id = value
@@ -114,6 +130,26 @@ class Task:
         self._last_updated = value
         db.update_one(collection_name, {"_id": self._uuid}, {"$set": {"last_updated": value}})
 
+    @course_link.setter
+    def course_link(self, value):
+        self._course_link = value
+        db.update_one(collection_name, {"_id": self._uuid}, {"$set": {"course_link": value}})
+
+    @index_status.setter
+    def index_status(self, value):
+        self._index_status = value
+        db.update_one(collection_name, {"_id": self._uuid}, {"$set": {"index_status": value}})
+
+    @status_fingerprint.setter
+    def status_fingerprint(self, value):
+        self._status_fingerprint = value
+        db.update_one(collection_name, {"_id": self._uuid}, {"$set": {"status_fingerprint": value}})
+
+    @next_check_at.setter
+    def next_check_at(self, value):
+        self._next_check_at = value
+        db.update_one(collection_name, {"_id": self._uuid}, {"$set": {"next_check_at": value}})
+
 
 def _get_task(query):
     return db.find_one(collection_name, query)
@@ -170,18 +206,22 @@ def create_tasks_bulk(user_id: int, tasks_data: list):
         - grade_status
         - time_left
         - last_change
-    Если некоторые ключи отсутствуют, можно задать для них значения по умолчанию.
+        - course_link
+        - index_status
+    Отсутствующие ключи заполняются из шаблона только у новых заданий, у существующих не меняются.
     """
     bulk_ops = []
     current_ts = time.time()
     for task in tasks_data:
-        template = deepcopy(templates.task_template)
-        template.update(task)
-        template["user_id"] = user_id
-        template.setdefault("last_updated", current_ts)
-
-        query = {"user_id": user_id, "task_link": template.get("task_link")}
-        update = {"$set": template}
+        fields = dict(task, user_id=user_id)
+        # Поля шаблона, которых нет в данных (отпечаток, срок перепроверки и т.п.), — только при вставке,
+        # чтобы /get_tasks не затирал то, что накопила плановая проверка
+        defaults = deepcopy(templates.task_template)
+        defaults["last_updated"] = current_ts
+        defaults = {key: value for key, value in defaults.items() if key not in fields}
+
+        query = {"user_id": user_id, "task_link": fields.get("task_link")}
+        update = {"$set": fields, "$setOnInsert": defaults}
         bulk_ops.append(UpdateOne(query, update, upsert=True))
 
     if bulk_ops:
@@ -190,6 +230,33 @@ def create_tasks_bulk(user_id: int, tasks_data: list):
     return None
 
 
+def update_deadlines_bulk(user_id: int, deadlines: dict):
+    """
+    Обновляет даты заданий пользователя за один bulk‑запрос.
+
+    :param user_id: Идентификатор пользователя (тип int).
+    :param deadlines: {task_link: {"open_date": ..., "due_date": ...}}, любое из полей может отсутствовать.
+    """
+    bulk_ops = [
+        UpdateOne({"user_id": user_id, "task_link": link}, {"$set": fields})
+        for link, fields in deadlines.items() if fields
+    ]
+    if bulk_ops:
+        return db.bulk_write(collection_name, bulk_ops)
+    return None
+
+
+def last_changed_by_user(since: float) -> dict[int, float]:
+    """
+    {user_id: время последнего изменения статуса задания} за изменения не раньше since.
+    """
+    cursor = db.get_collection(collection_name).aggregate([
+        {"$match": {"last_updated": {"$gte": since}}},
+        {"$group": {"_id": "$user_id", "last": {"$max": "$last_updated"}}}
+    ])
+    return {doc["_id"]: doc["last"] for doc in cursor}
+
+
 def select_task(query) -> Task:
     try:
         return Task(_get_task(query))
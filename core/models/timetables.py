@@ -0,0 +1,39 @@
+import time
+from typing import Optional
+
+from core.db import get_collection
+
+collection_name = "timetables"
+
+
+def _coll():
+    return get_collection(collection_name)
+
+
+def get_group_timetable(group: str, period: str) -> Optional[list[dict]]:
+    """
+    Разобранное расписание группы за период или None, если его нет или срок истёк.
+    """
+    doc = _coll().find_one({"group": group, "period": period})
+    if not doc or doc.get("expires_at", 0) <= time.time():
+        return None
+    return doc.get("entries")
+
+
+def get_fetched_at(group: str, period: str) -> float:
+    doc = _coll().find_one({"group": group, "period": period}, {"fetched_at": 1})
+    return doc.get("fetched_at", 0) if doc else 0
+
+
+def save_group_timetable(group: str, period: str, entries: list[dict], expires_at: float) -> None:
+    _coll().update_one(
+        {"group": group, "period": period},
+        {"$set": {
+            "group": group,
+            "period": period,
+            "entries": entries,
+            "fetched_at": time.time(),
+            "expires_at": expires_at,
+        }},
+        upsert=True
+    )
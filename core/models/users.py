@@ -20,6 +20,9 @@ class User:
         self._faculty = user.get("faculty")
         self._course = user.get("course")
         self._group = user.get("group")
+        self._course_fingerprints = user.get("course_fingerprints") or {}
+        self._courses = user.get("courses") or {}
+        self._next_check_at = user.get("next_check_at", 0)
 
     @property
     def uuid(self): return self._uuid
@@ -57,6 +60,15 @@ class User:
     @property
     def group(self): return self._group
 
+    @property
+    def course_fingerprints(self): return self._course_fingerprints
+
+    @property
+    def courses(self): return self._courses
+
+    @property
+    def next_check_at(self): return self._next_check_at
+
     @telegram_id.setter
     def telegram_id(self, value):
         self._telegram_id = value
@@ -79,8 +91,12 @@ class User:
 
     @notifications.setter
     def notifications(self, value):
+        fields = {"notifications": value}
+        if value and not self._notifications:
+            # Снова подписался: старый срок проверки давно прошёл, пусть заново встанет в график
+            fields["next_check_at"] = self._next_check_at = 0
         self._notifications = value
-        db.update_one(collection_name, {"telegram_id": self.telegram_id}, {"$set": {"notifications": value}})
+        db.update_one(collection_name, {"telegram_id": self.telegram_id}, {"$set": fields})
 
     @education_level.setter
     def education_level(self, value):
@@ -107,6 +123,21 @@ class User:
         self._group = value
         db.update_one(collection_name, {"telegram_id": self.telegram_id}, {"$set": {"group": value}})
 
+    @course_fingerprints.setter
+    def course_fingerprints(self, value):
+        self._course_fingerprints = value
+        db.update_one(collection_name, {"telegram_id": self.telegram_id}, {"$set": {"course_fingerprints": value}})
+
+    @courses.setter
+    def courses(self, value):
+        self._courses = value
+        db.update_one(collection_name, {"telegram_id": self.telegram_id}, {"$set": {"courses": value}})
+
+    @next_check_at.setter
+    def next_check_at(self, value):
+        self._next_check_at = value
+        db.update_one(collection_name, {"telegram_id": self.telegram_id}, {"$set": {"next_check_at": value}})
+
 
 def _get_user(telegram_id):
     return db.find_one(collection_name, {"telegram_id": telegram_id})
@@ -145,5 +176,35 @@ def custom_select(request):
     return map(User, db.find(collection_name, request))
 
 
+def ensure_schedule_index() -> None:
+    """
+    Индекс под выборку select_due; старым записям без next_check_at ставится 0 (не распределён).
+    """
+    coll = db.get_collection(collection_name)
+    coll.update_many({"next_check_at": {"$exists": False}}, {"$set": {"next_check_at": 0}})
+    coll.create_index([("notifications", 1), ("next_check_at", 1)])
+
+
+def select_due(now: float, limit: int, exclude=()):
+    """
+    Подписанные пользователи, чей срок плановой проверки наступил, — самые просроченные первыми.
+    exclude — telegram_id, которых пропустить (их проверка ещё идёт).
+    """
+    query = {"notifications": True, "next_check_at": {"$lte": now}}
+    if exclude:
+        query["telegram_id"] = {"$nin": list(exclude)}
+    cursor = (
+        db.get_collection(collection_name)
+        .find(query)
+        .sort("next_check_at", 1)
+        .limit(limit)
+    )
+    return map(User, cursor)
+
+
+def count_due(now: float) -> int:
+    return db.get_collection(collection_name).count_documents({"notifications": True, "next_check_at": {"$lte": now}})
+
+
 def remove_user(telegram_id) -> None:
     db.delete_one(collection_name, {"telegram_id": telegram_id})
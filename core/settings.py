@@ -1,5 +1,6 @@
 import os
 import platform
+import tempfile
 from urllib.parse import urljoin
 
 from dotenv import load_dotenv
@@ -8,16 +9,105 @@ load_dotenv()
 BASE_DIR = os.path.abspath(os.path.dirname(__file__) + "/..")
 
 
+def _backend_for(operation: str) -> str:
+    return os.getenv(f"SCRAPER_BACKEND_{operation.upper()}", os.getenv("SCRAPER_BACKEND", "selenium"))
+
+
 class Settings:
     # Основные URL LMS
     BASE_URL = os.getenv("BASE_URL", "https://lms.mtuci.ru")
     LOGIN_PAGE = urljoin(BASE_URL, "/lms/login/index.php")
     MY_COURSES_PAGE = urljoin(BASE_URL, "/lms/my/courses.php")
+    SESSION_PROBE_PAGE = urljoin(BASE_URL, "/lms/user/preferences.php")
     TIME_TABLE_URL = "https://lk.mtuci.ru/student/schedule?clear_history=true&period=month"
 
     # Ограничения
     MAX_MESSAGE_LENGTH = int(os.getenv("MAX_MESSAGE_LENGTH", "4000"))
     MAX_CONCURRENT_BROWSERS = int(os.getenv("MAX_CONCURRENT_BROWSERS", "3"))
+    # Сколько страниц одна сессия грузит одновременно (вкладки браузера / параллельные запросы)
+    PAGE_FETCH_CONCURRENCY = int(os.getenv("PAGE_FETCH_CONCURRENCY", "3"))
+    DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", "50"))
+    # Инкогнито‑контекстов на один процесс Chrome; 0 — отдельный браузер на пользователя
+    BROWSER_CONTEXTS = int(os.getenv("BROWSER_CONTEXTS", "0"))
+    MAX_CONCURRENT_CHECKS = MAX_CONCURRENT_BROWSERS * max(BROWSER_CONTEXTS, 1)
+    # Адаптивный лимит параллельных проверок: стартует с CHECKS_INITIAL и держится в [MIN, MAX];
+    # растёт, пока страница LMS грузится быстрее CHECK_LATENCY_TARGET с и ошибок меньше CHECK_ERROR_RATE_MAX.
+    # Для проверки через selenium MAX не выше MAX_CONCURRENT_CHECKS — больше браузеров в пуле нет
+    CHECKS_MIN = int(os.getenv("CHECKS_MIN", "1"))
+    CHECKS_MAX = int(os.getenv("CHECKS_MAX", str(2 * MAX_CONCURRENT_CHECKS)))
+    CHECKS_INITIAL = int(os.getenv("CHECKS_INITIAL", str(MAX_CONCURRENT_CHECKS)))
+    CHECK_LATENCY_TARGET = float(os.getenv("CHECK_LATENCY_TARGET", "5"))
+    CHECK_ERROR_RATE_MAX = float(os.getenv("CHECK_ERROR_RATE_MAX", "0.2"))
+
+    # Конвейер проверки: процессов для разбора HTML страниц заданий, размер очереди между этапами
+    # и число обработчиков этапов diff (сравнение и запись в БД) и notify (сообщения в Telegram)
+    PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", "2"))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+    PIPELINE_DIFF_WORKERS = int(os.getenv("PIPELINE_DIFF_WORKERS", "2"))
+    PIPELINE_NOTIFY_WORKERS = int(os.getenv("PIPELINE_NOTIFY_WORKERS", "4"))
+
+    # Непрерывная плановая проверка: как часто искать пользователей с наступившим сроком (с),
+    # случайный сдвиг срока (доля интервала) и отставание от графика (доля интервала), о котором сообщаем
+    SCHEDULE_TICK = float(os.getenv("SCHEDULE_TICK", "5"))
+    SCHEDULE_JITTER = float(os.getenv("SCHEDULE_JITTER", "0.1"))
+    SCHEDULE_LAG_WARN = float(os.getenv("SCHEDULE_LAG_WARN", "0.5"))
+    # Уровни пользователей: активность (команда или изменение задания) за "X,Y" дней → active / regular,
+    # иначе dormant; интервал проверки умножается на USER_TIER_FACTORS соответственно.
+    # В тихие часы "с-по" (МСК) множитель не меньше CHECK_QUIET_FACTOR
+    USER_TIER_DAYS = tuple(map(int, os.getenv("USER_TIER_DAYS", "3,14").split(",")))
+    USER_TIER_FACTORS = tuple(map(float, os.getenv("USER_TIER_FACTORS", "1,3,12").split(",")))
+    CHECK_QUIET_HOURS = tuple(map(int, os.getenv("CHECK_QUIET_HOURS", "1-7").split("-")))
+    CHECK_QUIET_FACTOR = float(os.getenv("CHECK_QUIET_FACTOR", "12"))
+
+    # Предохранитель LMS: столько таймаутов за BREAKER_WINDOW с размыкают цепь на BREAKER_COOLDOWN с
+    BREAKER_TIMEOUTS = int(os.getenv("BREAKER_TIMEOUTS", "10"))
+    BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "120"))
+    BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "300"))
+    BREAKER_PROBE_TIMEOUT = float(os.getenv("BREAKER_PROBE_TIMEOUT", "5"))
+    DRIVER_POOL_TIMEOUT = float(os.getenv("DRIVER_POOL_TIMEOUT", "300"))
+    # Профили браузеров (у каждого процесса бота свой подкаталог pid-<pid>),
+    # порог «утечки» — сколько браузер может быть выдан одному заёмщику — и период уборки (с)
+    BROWSER_PROFILE_DIR = os.getenv("BROWSER_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "lms-bot-chrome"))
+    BROWSER_LEAK_AGE = int(os.getenv("BROWSER_LEAK_AGE", "900"))
+    BROWSER_REAP_INTERVAL = int(os.getenv("BROWSER_REAP_INTERVAL", "60"))
+
+    # Бэкенд сбора данных: selenium | http | ws (selenium остаётся запасным)
+    SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "selenium")
+    SCRAPER_BACKENDS = {op: _backend_for(op) for op in ("login", "tasks", "check")}
+    # Расписание по умолчанию — браузер. http повторяет запрос getProcessor, пойманный браузером сегодня
+    # для того же логина (браузер остаётся запасным); за общим кешем групп такой запрос бывает редко
+    SCRAPER_BACKENDS["timetable"] = os.getenv("SCRAPER_BACKEND_TIMETABLE", "selenium")
+    MOODLE_WS_URL = os.getenv("MOODLE_WS_URL", urljoin(BASE_URL, "/lms/"))
+    MOODLE_WS_SERVICE = os.getenv("MOODLE_WS_SERVICE", "moodle_mobile_app")
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    # Парсер HTML для http‑бэкенда: html.parser | lxml (нужен pip install lxml)
+    HTML_PARSER = os.getenv("HTML_PARSER", "html.parser")
+
+    # Курс без изменений в «Обзоре оценок» всё равно перепроверяется полностью раз в столько секунд
+    FULL_CHECK_INTERVAL = int(os.getenv("FULL_CHECK_INTERVAL", "3600"))
+    # Как часто открывать страницы заданий по приоритету "warm,cool,idle" (с): ждёт оценки или срок
+    # ближе недели / срок далеко / оценено и закрыто. У самого срока и после изменений — каждую проверку
+    TASK_CHECK_INTERVALS = tuple(map(int, os.getenv("TASK_CHECK_INTERVALS", "10800,86400,604800").split(",")))
+
+    # Сколько секунд список курсов пользователя считается свежим
+    COURSES_CACHE_TTL = int(os.getenv("COURSES_CACHE_TTL", str(24 * 3600)))
+
+    # Расписание группы хранится столько секунд и заранее обновляется ночью в часы "с-по" (МСК)
+    TIMETABLE_CACHE_TTL = int(os.getenv("TIMETABLE_CACHE_TTL", str(24 * 3600)))
+    TIMETABLE_PREFETCH_HOURS = tuple(map(int, os.getenv("TIMETABLE_PREFETCH_HOURS", "3-6").split("-")))
+
+    # Каталог групп по COURSES_MAP: сколько браузеров собирают его одновременно и как часто пересобирать (с);
+    # собирается в те же ночные часы TIMETABLE_PREFETCH_HOURS
+    GROUPS_CATALOG_CONCURRENCY = int(os.getenv("GROUPS_CATALOG_CONCURRENCY", "2"))
+    GROUPS_CATALOG_INTERVAL = int(os.getenv("GROUPS_CATALOG_INTERVAL", str(7 * 24 * 3600)))
+
+    # Насколько назад смотреть в календаре LMS, чтобы не терять недавно просроченные задания
+    DEADLINE_LOOKBACK_DAYS = int(os.getenv("DEADLINE_LOOKBACK_DAYS", "14"))
+
+    # Сохранённые куки LMS/lk.mtuci.ru, чтобы не логиниться на каждой проверке
+    LMS_SESSION_TTL = int(os.getenv("LMS_SESSION_TTL", str(6 * 3600)))
+    COOKIE_DOMAIN = os.getenv("COOKIE_DOMAIN", "mtuci.ru")
 
     # Ключ шифрования и токен бота
     ENCRYPTION_KEY = os.environ["ENCRYPTION_KEY"]
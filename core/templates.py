@@ -9,7 +9,10 @@ user_template = {
     "study_form": None,
     "faculty": None,
     "course": None,
-    "group": None
+    "group": None,
+    "course_fingerprints": {},  # {id курса: {"hash": ..., "checked_at": ...}}
+    "courses": {},  # {"links": [...], "hash": ..., "fetched_at": ...}
+    "next_check_at": 0  # Срок следующей плановой проверки (unix‑время), 0 — ещё не распределён
 }
 
 task_template = {
@@ -23,7 +26,11 @@ task_template = {
     "grade_status": "",
     "time_left": "",
     "last_change": "",
-    "last_updated": 0
+    "last_updated": 0,
+    "course_link": "",  # Ссылка на курс, нужна для mod/assign/index.php
+    "index_status": "",  # Строка задания в индексе заданий курса на момент последней проверки
+    "status_fingerprint": "",  # Отпечаток таблицы состояния задания на момент последней проверки
+    "next_check_at": 0  # Когда плановой проверке пора снова открыть страницу задания (unix‑время)
 }
 
 command_config_template = {
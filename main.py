@@ -14,7 +14,7 @@ from telegram.ext import ApplicationBuilder, Application
 
 from core.settings import Settings
 from bot import register_handlers
-from scheduler import background_check
+from scheduler import background_check, background_groups_catalog, background_timetable_prefetch
 from utils.logger_utils import SafeColorHandler, CustomLogMiddleware
 from webapp.routes import register_blueprints
 
@@ -28,40 +28,45 @@ LOG_COLORS = {
     "CRITICAL": "bold_red",
 }
 
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
-
-
-formatter = colorlog.ColoredFormatter(
-    fmt=LOG_FORMAT,
-    datefmt=DATE_FORMAT,
-    log_colors=LOG_COLORS,
-    reset=False,
-    style='{'
-)
-
-handler = SafeColorHandler(stream=sys.stdout)
-handler.setFormatter(formatter)
-
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.INFO)
-root_logger.addHandler(handler)
-
-settings = Settings()
-log_path = settings.LOG_FILE
-log_dir = os.path.dirname(log_path)
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir, exist_ok=True)
-
-file_handler = RotatingFileHandler(
-    log_path,
-    maxBytes=50 * 1024 * 1024,
-    backupCount=1024,
-    encoding="utf-8"
-)
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(formatter)
-root_logger.addHandler(file_handler)
+
+def setup_logging(settings: Settings):
+    """
+    Консоль и общий файл логов. Только в главном процессе: дочерние процессы (пул разбора HTML)
+    импортируют этот модуль, и второй RotatingFileHandler на том же файле ротировал бы его наперегонки.
+    """
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+    formatter = colorlog.ColoredFormatter(
+        fmt=LOG_FORMAT,
+        datefmt=DATE_FORMAT,
+        log_colors=LOG_COLORS,
+        reset=False,
+        style='{'
+    )
+
+    handler = SafeColorHandler(stream=sys.stdout)
+    handler.setFormatter(formatter)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(handler)
+
+    log_path = settings.LOG_FILE
+    log_dir = os.path.dirname(log_path)
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = RotatingFileHandler(
+        log_path,
+        maxBytes=50 * 1024 * 1024,
+        backupCount=1024,
+        encoding="utf-8"
+    )
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    root_logger.addHandler(file_handler)
+
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +100,7 @@ def run_webadmin(settings: Settings):
 
 def main():
     settings = Settings()
+    setup_logging(settings)
 
     # 1. Запускаем нашу веб-админку
     Thread(target=run_webadmin, args=(settings,), daemon=True).start()
@@ -115,6 +121,8 @@ def main():
 
         if platform.system() != "Windows":
             asyncio.create_task(background_check(application))
+            asyncio.create_task(background_timetable_prefetch(application))
+            asyncio.create_task(background_groups_catalog(application))
 
     app = (
         ApplicationBuilder()
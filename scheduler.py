@@ -1,21 +1,28 @@
 import asyncio
 import logging
+import random
 import time
 import time as _time
+from collections import defaultdict
+from datetime import datetime
 
-from bs4 import BeautifulSoup
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 from telegram.ext import Application
 
 from core.db import insert
 from core.models.config import get_scheduled_enabled, get_schedule_interval
-from core.models.tasks import custom_select as task_select
-from core.models.users import custom_select as user_select
+from core.models.tasks import custom_select as task_select, update_deadlines_bulk
+from core.models.users import count_due, custom_select as user_select, ensure_schedule_index, select_due
 from core.settings import Settings
+from services.check_pipeline import FairWorkQueue, Pipeline, get_parse_pool
+from services.circuit_breaker import LmsUnavailableError
 from services.encryption import EncryptionService
+from services.extractors import parse_statuses
+from services.engagement import EngagementTiers
+from services.groups_catalog import build_catalog, catalog_age
+from services.moodle_ws import MOSCOW_TZ, MoodleWsClient
 from services.scraper import Scraper
+from utils.fingerprint_utils import course_fingerprint, status_fingerprint
+from utils.priority_utils import next_check_at
 
 logger = logging.getLogger(__name__)
 
@@ -27,66 +34,212 @@ async def scheduled_check(
         encryptor: EncryptionService
 ):
     """
-    Основная точка входа — перебирает всех подписанных пользователей,
-    запускает их проверку в параллельных потоках, ограниченных семафором
+    Разовая проверка всех подписанных пользователей (ручной запуск из админки):
+    все проходят через собственный конвейер build_pipeline, одновременные входы в LMS
+    ограничивает AdaptiveLimiter
     """
     if get_scheduled_enabled():
-        start_wall = time.time()
-        tasks_list = list(task_select({}))
-        total_tasks = len(tasks_list)
-        users_with_tasks = {t.user_id for t in tasks_list}
-        total_users_with_tasks = len(users_with_tasks)
+        # Пока LMS лежит, не тратим браузеры и логины на заведомо неудачную проверку
+        if not await asyncio.to_thread(scraper.breaker.ready):
+            logger.warning("LMS недоступна — плановая проверка пропущена")
+            insert("data", {
+                "type": "scheduled_check_skipped",
+                "breaker_state": scraper.breaker.state,
+                "timestamp": time.time()
+            })
+            return
 
-        start_ts = time.perf_counter()
+        start_wall = time.time()
         logger.info("=== НАЧАЛО ПРОВЕРКИ ЗАДАНИЙ ===")
 
         users = list(user_select({"notifications": True}))
         logger.info(f"Пользователей для проверки: {len(users)}")
 
-        sem = asyncio.Semaphore(settings.MAX_CONCURRENT_BROWSERS)
-        tasks = [
-            asyncio.create_task(
-                _check_one_user(u, app, settings, scraper, encryptor, sem)
-            )
-            for u in users
-        ]
-        await asyncio.gather(*tasks)
+        pipeline = build_pipeline(app, settings, scraper, encryptor)
+        try:
+            futures = [await pipeline.submit(UserCheck(u)) for u in users]
+            checks = await asyncio.gather(*futures)
+            stages = pipeline.snapshot()
+        finally:
+            await pipeline.close()
 
-        elapsed = time.perf_counter() - start_ts
         end_wall = time.time()
-        logger.info(f"=== ПРОВЕРКА ЗАВЕРШЕНА (за {elapsed:.2f} с) ===")
+        logger.info(f"=== ПРОВЕРКА ЗАВЕРШЕНА (за {end_wall - start_wall:.2f} с) ===")
+        _record_check(start_wall, end_wall, [c.stats for c in checks], scraper, stages=stages)
 
-        insert("data", {
-            "type": "scheduled_check",
-            "start_ts": start_wall,
-            "end_ts": end_wall,
-            "duration": elapsed,
-            "total_tasks": total_tasks,
-            "users_with_tasks": total_users_with_tasks,
-            "checked_users": len(users)
-        })
 
-async def _check_one_user(
-        user,
-        app: Application,
-        settings: Settings,
-        scraper: Scraper,
-        encryptor: EncryptionService,
-        sem: asyncio.Semaphore
-):
+def _record_check(start_wall: float, end_wall: float, stats: list[dict], scraper: Scraper, **extra):
     """
-    Обёртка для одной проверки пользователя:
-    - offload синхронного _check_user_sync в поток
-    - отправка сообщений об изменениях
+    Сводка проверки (разовой или круга непрерывной) в data: счётчики из stats каждого пользователя.
     """
-    async with sem:
-        # offload тяжёлой работы в поток
-        changes = await asyncio.to_thread(
-            _check_user_sync, user, settings, scraper, encryptor
-        )
+    tasks_list = list(task_select({}))
+    skipped_users = sum(s["skipped"] for s in stats)
+    if skipped_users:
+        logger.warning(f"LMS перестала отвечать во время проверки, пропущено пользователей: {skipped_users}")
+
+    insert("data", {
+        "type": "scheduled_check",
+        "start_ts": start_wall,
+        "end_ts": end_wall,
+        "duration": end_wall - start_wall,
+        "total_tasks": len(tasks_list),
+        "users_with_tasks": len({t.user_id for t in tasks_list}),
+        "checked_users": len(stats),
+        # страницы заданий, где отпечаток таблицы состояния совпал и сравнение не понадобилось
+        "status_checked": sum(s["checked"] for s in stats),
+        "status_unchanged": sum(s["unchanged"] for s in stats),
+        # задания, которым по приоритету (срок, состояние) ещё рано на проверку
+        "status_deferred": sum(s["deferred"] for s in stats),
+        # страницы заданий, которые загрузил не «свой» браузер, а освободившийся чужой
+        "units_stolen": sum(s["stolen"] for s in stats),
+        # адаптивный лимит параллельных проверок и сглаженная задержка страницы LMS на конец проверки
+        "concurrency_limit": scraper.limiter.limit,
+        "page_latency": scraper.limiter.latency,
+        # пользователи, до которых не дошли из‑за разомкнутого предохранителя LMS
+        "skipped_users": skipped_users,
+        "breaker_state": scraper.breaker.state,
+        **extra
+    })
+
+class UserCheck:
+    """
+    Проверка одного пользователя, которая идёт по этапам конвейера build_pipeline.
+    stats — счётчики для сводки проверки: загруженные страницы заданий, совпавшие отпечатки,
+    задания, отложенные по приоритету, пропуск пользователя из‑за недоступной LMS
+    и страницы чужих проверок, загруженные браузером этой (stolen).
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.client = None
+        self.stats = {"checked": 0, "unchanged": 0, "deferred": 0, "skipped": 0, "stolen": 0}
+        self.plan = None  # (now, overview, moved, to_check, indexed) из _plan_user_pages
+        self.pages = []  # страницы заданий: HTML (до parse) или {заголовок: значение} / None
+        self.cookies = []  # сессия LMS, с которой чужие браузеры грузят страницы этой проверки
+        self.lms_user_id = None  # id пользователя LMS в этой сессии: с ним сверяется перенос cookies
+        self.changes = []
+
+
+def build_pipeline(app: Application, settings: Settings, scraper: Scraper, encryptor: EncryptionService) -> Pipeline:
+    """
+    Конвейер плановой проверки, у каждого этапа своя параллельность:
+      - session: вход в LMS. Здесь берётся слот AdaptiveLimiter, и держится он только до конца fetch,
+        поэтому браузер занят входом и загрузкой страниц, а не разбором и рассылкой;
+      - fetch: сроки, обзор оценок, индексы курсов, затем страницы заданий через общую
+        очередь FairWorkQueue (load_pages); после этого клиент закрывается;
+      - parse: HTML страниц заданий (http‑бэкенд) разбирается в пуле из PARSE_PROCESSES процессов;
+      - diff: сравнение с БД и запись изменений;
+      - notify: сообщения в Telegram.
+    """
+    limiter = scraper.limiter
+    work = FairWorkQueue()
+
+    async def session(check: UserCheck):
+        user = check.user
+        await limiter.acquire()
+        try:
+            pwd = encryptor.decrypt(user.mtuci_password)
+            check.client = await asyncio.to_thread(scraper.login_client, "check", user.mtuci_login, pwd)
+            return check
+        except LmsUnavailableError:
+            check.stats["skipped"] += 1
+        except Exception as e:
+            logger.exception(f"[{user.telegram_id}] Не удалось войти в LMS: {e}")
+        limiter.release()
+        return None
+
+    async def fetch(check: UserCheck):
+        try:
+            await asyncio.to_thread(_plan_user_pages, check, settings, scraper)
+            await load_pages(check)
+            return check
+        except Exception as e:
+            logger.exception(f"[{check.user.telegram_id}] Ошибка при загрузке страниц LMS: {e}")
+            return None
+        finally:
+            try:
+                await asyncio.to_thread(scraper.close_client, check.client)
+                logger.info(f"[{check.user.telegram_id}] Клиент LMS закрыт")
+            finally:
+                check.client = None
+                limiter.release()
+
+    async def load_pages(check: UserCheck):
+        """
+        Страницы заданий — единицы общей очереди work. Браузер пользователя грузит их пачками
+        по PAGE_FETCH_CONCURRENCY, пока все его страницы не загружены: сначала свои, а когда
+        свои разобраны — чужие (work stealing), подставив куки их владельца. Так проверка
+        с десятками заданий не держит один браузер, пока остальные простаивают.
+        После подстановки куки LMS должна видеть владельца (session_user); если нет — страницы
+        возвращаются владельцу, и дальше он грузит их только сам.
+        """
+        to_check = check.plan[3]
+        if not to_check:
+            return
+        if isinstance(check.client, MoodleWsClient):
+            # сессия веб‑сервиса — токен, а не куки: её страницы другим браузерам не передать
+            check.pages = await asyncio.to_thread(
+                scraper.fetch_task_pages, check.client, [t.task_link for t, _ in to_check]
+            )
+            return
+
+        check.cookies = await asyncio.to_thread(scraper.export_session, check.client)
+        try:
+            check.lms_user_id = await asyncio.to_thread(scraper.session_user, check.client)
+        except Exception as e:
+            logger.warning(f"[{check.user.telegram_id}] Не удалось определить пользователя сессии LMS: {e}")
+        # Без id владельца перенос его сессии не проверить — такие страницы грузит только он сам
+        await work.add(check, list(range(len(to_check))), shared=check.lms_user_id is not None)
+        session_of = check
+        while True:
+            taken = await work.take(session_of, settings.PAGE_FETCH_CONCURRENCY)
+            if taken is None:
+                if await work.wait(check):
+                    return
+                continue
+            owner, units = taken
+            links = [owner.plan[3][i][0].task_link for i in units]
+            try:
+                if owner is not session_of:
+                    session_of = None
+                    if not await asyncio.to_thread(
+                        scraper.import_session, check.client, owner.cookies, owner.lms_user_id
+                    ):
+                        if owner is not check:
+                            logger.warning(
+                                f"[{owner.user.telegram_id}] Сессия не перенеслась в чужой браузер — "
+                                f"страницы вернулись владельцу"
+                            )
+                            await work.give_back(owner, units)
+                            continue
+                        raise RuntimeError("сессия LMS пользователя больше не действует")
+                    session_of = owner
+                if owner is not check:
+                    check.stats["stolen"] += len(units)
+                pages = await asyncio.to_thread(scraper.fetch_task_pages, check.client, links)
+            except Exception as e:
+                logger.warning(f"[{owner.user.telegram_id}] Не удалось загрузить страницы заданий: {e}")
+                pages = [None] * len(units)
+            for i, page in zip(units, pages):
+                owner.pages[i] = page
+            await work.done(owner, units)
+
+    async def parse(check: UserCheck):
+        html = [i for i, page in enumerate(check.pages) if isinstance(page, str)]
+        if html:
+            statuses = await asyncio.get_running_loop().run_in_executor(
+                get_parse_pool(settings), parse_statuses, [check.pages[i] for i in html]
+            )
+            for i, status in zip(html, statuses):
+                check.pages[i] = status
+        return check
+
+    async def diff(check: UserCheck):
+        check.changes = await asyncio.to_thread(_apply_statuses, check, settings)
+        return check if check.changes else None
 
-        # теперь в async-контексте шлём телеграм‑сообщения
-        for c in changes:
+    async def notify(check: UserCheck):
+        for c in check.changes:
             text = (
                 f"<b>Задача:</b> {c['course']} | {c['name']}\n"
                 f"┠─ <b>Статус ответа:</b> {c['old_resp']} → {c['new_resp']}\n"
@@ -95,92 +248,357 @@ async def _check_one_user(
             )
             if app is not None:
                 await app.bot.send_message(
-                    chat_id=user.telegram_id,
+                    chat_id=check.user.telegram_id,
                     text=text,
                     parse_mode="HTML",
                     disable_web_page_preview=True
                 )
             else:
                 print(text)
+        return check
 
-def _check_user_sync(user, settings, scraper: Scraper, encryptor: EncryptionService):
+    return (
+        Pipeline(settings.PIPELINE_QUEUE_SIZE)
+        .stage("session", session, limiter.ceiling)
+        .stage("fetch", fetch, limiter.ceiling, backlog=work.depth)
+        .stage("parse", parse, settings.PARSE_PROCESSES)
+        .stage("diff", diff, settings.PIPELINE_DIFF_WORKERS)
+        .stage("notify", notify, settings.PIPELINE_NOTIFY_WORKERS)
+        .start()
+    )
+
+
+def _plan_user_pages(check: UserCheck, settings: Settings, scraper: Scraper):
     """
-    Всё синхронно: заводим WebDriver, логинимся, парсим задания,
-    сравниваем старое/новое состояние, обновляем модель и собираем список изменений.
-    Возвращает list[dict], где каждый dict = данные для одного уведомления.
+    Начало этапа fetch (в потоке, клиент уже залогинен): обновляет сроки и по «Обзору оценок»,
+    отпечаткам курсов и индексам решает, страницы каких заданий нужно загрузить.
     """
-    driver = scraper.init_driver()
-    wait = WebDriverWait(driver, 20)
-    changes = []
+    user, client, stats = check.user, check.client, check.stats
 
+    # Сроки всех заданий одним запросом к календарю, без обхода курсов
     try:
-        pwd = encryptor.decrypt(user.mtuci_password)
-        scraper.login(driver, user.mtuci_login, pwd)
+        update_deadlines_bulk(user.telegram_id, scraper.fetch_deadlines(client))
+    except Exception as e:
+        logger.warning(f"[{user.telegram_id}] Не удалось обновить сроки заданий: {e}")
 
-        db_tasks = list(task_select({"user_id": user.telegram_id}))
-        logger.info(f"[{user.mtuci_login}] Задач в БД: {len(db_tasks)}")
+    db_tasks = list(task_select({"user_id": user.telegram_id}))
+    logger.info(f"[{user.mtuci_login}] Задач в БД: {len(db_tasks)}")
 
-        for task in db_tasks:
-            try:
-                driver.get(task.task_link)
-                wait.until(EC.presence_of_element_located((By.CLASS_NAME, "generaltable")))
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-
-                table = soup.find("table", class_="generaltable table-bordered")
-                if not table:
-                    logger.warning(f"[{user.telegram_id}] Нет таблицы на {task.task_link}")
-                    continue
-
-                old_resp, old_grade = task.response_status, task.grade_status
-                new_resp = new_grade = "—"
-                for row in table.find_all("tr"):
-                    th, td = row.find("th"), row.find("td")
-                    if not (th and td):
-                        continue
-                    key, val = th.get_text(strip=True), td.get_text(strip=True)
-                    if key == "Состояние ответа на задание":
-                        new_resp = val
-                    elif key == "Состояние оценивания":
-                        new_grade = val
-
-                if (new_resp != old_resp) or (new_grade != old_grade):
-                    logger.info(
-                        f"[{user.telegram_id}] Изменение «{task.task_name}»: "
-                        f"{old_resp}→{new_resp}, {old_grade}→{new_grade}"
-                    )
-                    task.response_status = new_resp
-                    task.grade_status = new_grade
-                    task.last_updated = _time.time()
-
-                    # добавляем в уведомления
-                    changes.append({
-                        "course": task.course,
-                        "name": task.task_name,
-                        "old_resp": old_resp,
-                        "new_resp": new_resp,
-                        "old_grade": old_grade,
-                        "new_grade": new_grade,
-                        "link": task.task_link
-                    })
-            except Exception as e:
-                logger.exception(f"[{user.telegram_id}] Ошибка при проверке «{task.task_name}»: {e}")
+    # Дешёвый первый этап: «Обзор оценок» + отпечатки курсов.
+    # Дальше проверяются только курсы, чей отпечаток сдвинулся.
+    by_course = defaultdict(list)
+    for t in db_tasks:
+        by_course[scraper.course_id(t.course_link) if t.course_link else ""].append(t)
+    try:
+        overview = scraper.fetch_grades_overview(client)
+    except Exception as e:
+        logger.warning(f"[{user.telegram_id}] Не удалось загрузить обзор оценок: {e}")
+        overview = None
 
+    now = _time.time()
+    stored = user.course_fingerprints
+    moved = {}
+    for course_id, course_tasks in by_course.items():
+        prev = stored.get(course_id)
+        same = (
+            overview is not None and course_id and prev
+            and prev["hash"] == course_fingerprint(overview.get(course_id), course_tasks)
+        )
+        if same and now - prev["checked_at"] < settings.FULL_CHECK_INTERVAL:
+            continue
+        # Обзор не сдвинулся, а заданиям курса по приоритету ещё рано — не грузим даже индекс
+        if same and not any(t.next_check_at <= now for t in course_tasks):
+            continue
+        moved[course_id] = course_tasks
+    logger.info(f"[{user.telegram_id}] Курсов к проверке: {len(moved)} из {len(by_course)}")
+    db_tasks = [t for course_tasks in moved.values() for t in course_tasks]
+
+    # Индекс заданий курса: одна страница на курс вместо страницы на каждое задание.
+    # Курсы, с которых пользователь отчислен, пропускаем по кешированному списку курсов.
+    try:
+        enrolled = {scraper.course_id(link) for link in scraper.courses.get(user, client)}
     except Exception as e:
-        logger.exception(f"[{user.telegram_id}] Ошибка в _check_user_sync: {e}")
-    finally:
-        scraper.quit_and_clear(driver)
-        logger.info(f"[{user.telegram_id}] WebDriver закрыт")
+        logger.warning(f"[{user.telegram_id}] Не удалось получить список курсов: {e}")
+        enrolled = None
+    index = {}
+    for course_link in {t.course_link for t in db_tasks if t.course_link}:
+        if enrolled is not None and scraper.course_id(course_link) not in enrolled:
+            continue
+        try:
+            index.update(scraper.fetch_course_index(client, course_link))
+        except Exception as e:
+            logger.warning(f"[{user.telegram_id}] Не удалось загрузить индекс {course_link}: {e}")
+
+    to_check = []
+    indexed = []
+    for task in db_tasks:
+        if enrolled is not None and task.course_link and scraper.course_id(task.course_link) not in enrolled:
+            continue
+        signature = index.get(task.task_link)
+        if signature and signature == task.index_status and task.response_status:
+            indexed.append(task)
+            continue
+        # Заданию ещё рано по приоритету: открываем, только если его строка в индексе сдвинулась
+        if task.next_check_at > now and not signature:
+            stats["deferred"] += 1
+            continue
+        to_check.append((task, signature))
+
+    # Сами страницы заданий грузит load_pages из build_pipeline — вперемешку с другими пользователями
+    check.pages = [None] * len(to_check)
+    check.plan = (now, overview, moved, to_check, indexed)
+
+
+def _apply_statuses(check: UserCheck, settings: Settings) -> list[dict]:
+    """
+    Этап diff: сравнивает разобранные таблицы состояния с БД, записывает изменения,
+    приоритеты заданий и отпечатки курсов.
+    Возвращает list[dict], где каждый dict = данные для одного уведомления.
+    """
+    user, stats = check.user, check.stats
+    now, overview, moved, to_check, indexed = check.plan
+    changes = []
+
+    # Строка в индексе курса не сдвинулась — задание проверено, сдвигаем и его срок перепроверки,
+    # иначе курс с «просроченным» заданием грузил бы индекс в каждом цикле
+    for task in indexed:
+        if task.next_check_at <= now:
+            task.next_check_at = next_check_at(task, now, settings.TASK_CHECK_INTERVALS)
+
+    failed = set()
+    for (task, signature), status in zip(to_check, check.pages):
+        try:
+            if status is None:
+                logger.warning(f"[{user.telegram_id}] Нет таблицы на {task.task_link}")
+                failed.add(task.course_link)
+                continue
+
+            # Таблица состояния не изменилась с прошлой проверки — сравнивать и писать нечего
+            stats["checked"] += 1
+            fingerprint = status_fingerprint(status)
+            if fingerprint == task.status_fingerprint:
+                stats["unchanged"] += 1
+                if signature and signature != task.index_status:
+                    task.index_status = signature
+                task.next_check_at = next_check_at(task, now, settings.TASK_CHECK_INTERVALS)
+                continue
+
+            old_resp, old_grade = task.response_status, task.grade_status
+            new_resp = status.get("Состояние ответа на задание", "—")
+            new_grade = status.get("Состояние оценивания", "—")
+
+            if (new_resp != old_resp) or (new_grade != old_grade):
+                logger.info(
+                    f"[{user.telegram_id}] Изменение «{task.task_name}»: "
+                    f"{old_resp}→{new_resp}, {old_grade}→{new_grade}"
+                )
+                task.response_status = new_resp
+                task.grade_status = new_grade
+                task.last_updated = _time.time()
+
+                # добавляем в уведомления
+                changes.append({
+                    "course": task.course,
+                    "name": task.task_name,
+                    "old_resp": old_resp,
+                    "new_resp": new_resp,
+                    "old_grade": old_grade,
+                    "new_grade": new_grade,
+                    "link": task.task_link
+                })
+
+            if signature and signature != task.index_status:
+                task.index_status = signature
+            task.status_fingerprint = fingerprint
+            task.next_check_at = next_check_at(task, now, settings.TASK_CHECK_INTERVALS)
+        except Exception as e:
+            failed.add(task.course_link)
+            logger.exception(f"[{user.telegram_id}] Ошибка при проверке «{task.task_name}»: {e}")
+
+    if overview is not None:
+        fingerprints = dict(user.course_fingerprints)
+        for course_id, course_tasks in moved.items():
+            if course_id and not any(t.course_link in failed for t in course_tasks):
+                fingerprints[course_id] = {
+                    "hash": course_fingerprint(overview.get(course_id), course_tasks),
+                    "checked_at": now,
+                }
+        user.course_fingerprints = fingerprints
 
     return changes
 
 
 async def background_check(app):
+    """
+    Непрерывная плановая проверка. У каждого подписанного пользователя свой next_check_at;
+    раз в SCHEDULE_TICK секунд запускаются те, чей срок наступил, а следующий срок ставится
+    ровно через интервал от прошлого (±SCHEDULE_JITTER), а не от конца проверки;
+    интервал умножается на множитель уровня вовлечённости пользователя (EngagementTiers).
+    Новые пользователи равномерно раскладываются по интервалу, так что нагрузка на LMS ровная.
+    Отставание от графика больше SCHEDULE_LAG_WARN интервала пишется в лог и в data (schedule_lag).
+    Раз в интервал в data пишется сводка scheduled_check — как у разовой проверки.
+    """
     await asyncio.sleep(5)
 
     settings = Settings()
     scraper = Scraper(settings)
     encryptor = EncryptionService(settings.ENCRYPTION_KEY)
+    await asyncio.to_thread(ensure_schedule_index)
+
+    tiers = EngagementTiers(settings)
+    pipeline = build_pipeline(app, settings, scraper, encryptor)
+    # идущие проверки → telegram_id: пока проверка пользователя не закончилась, вторая не запускается,
+    # даже если при медленной LMS его следующий срок уже наступил
+    inflight: dict[asyncio.Task, int] = {}
+    round_stats: list[dict] = []
+    round_tiers = defaultdict(int)
+    round_start = time.time()
+    max_lag = 0.0
+    last_lag_report = 0.0
+
+    def collect(task: asyncio.Task):
+        inflight.pop(task, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error(f"Ошибка плановой проверки пользователя: {task.exception()}")
+            return
+        round_stats.append(task.result().stats)
+
+    while True:
+        await asyncio.sleep(settings.SCHEDULE_TICK)
+        if not await asyncio.to_thread(get_scheduled_enabled):
+            continue
+        period = await asyncio.to_thread(get_schedule_interval) * 60
+        now = time.time()
+
+        if now - round_start >= period:
+            # Круг закрывается до записи сводки: проверки, закончившиеся за время записи, уйдут в новый
+            stats, tiers_seen, started, lag_seen = round_stats, dict(round_tiers), round_start, max_lag
+            round_stats = []
+            round_tiers = defaultdict(int)
+            round_start = now
+            max_lag = 0.0
+            await asyncio.to_thread(
+                _record_check,
+                started, now, stats, scraper,
+                max_lag=lag_seen, tiers=tiers_seen, stages=pipeline.snapshot(reset=True), rolling=True
+            )
+
+        # Пока LMS лежит, пользователей не разбираем: их сроки дождутся восстановления
+        if not await asyncio.to_thread(scraper.breaker.allow):
+            continue
+
+        # В конвейере держим не больше пары очередей лимитера: остальные ждут в БД и видны как отставание
+        free = scraper.limiter.ceiling * 2 - len(inflight)
+        batch, lag, lag_reported = await asyncio.to_thread(
+            _plan_batch, settings, tiers, now, period, free, set(inflight.values()),
+            report_lag=now - last_lag_report >= period,
+        )
+        if lag is not None:
+            max_lag = max(max_lag, lag)
+        if lag_reported:
+            last_lag_report = now
+
+        for user, tier in batch:
+            round_tiers[tier] += 1
+            task = asyncio.create_task(pipeline.run(UserCheck(user)))
+            inflight[task] = user.telegram_id
+            task.add_done_callback(collect)
+
+
+def _plan_batch(settings: Settings, tiers: EngagementTiers, now: float, period: float, free: int,
+                exclude: set[int], report_lag: bool) -> tuple[list, float | None, bool]:
+    """
+    Вся работа тика плановой проверки с БД — одним вызовом в потоке, чтобы не держать event loop:
+    раскладывает по интервалу новых пользователей, выбирает до free пользователей со сроком
+    (кроме exclude — их проверки ещё идут), определяет их уровень и ставит следующий срок.
+    При report_lag отставание больше SCHEDULE_LAG_WARN интервала пишется в лог и в data.
+    Возвращает пары (пользователь, уровень), отставание первого в очереди (None, если очередь пуста)
+    и признак того, что отставание записано.
+    """
+    unscheduled = list(user_select({"notifications": True, "next_check_at": 0}))
+    for i, user in enumerate(unscheduled):
+        user.next_check_at = now + (i + random.random()) * period / len(unscheduled)
+
+    due = list(select_due(now, max(free, 1), exclude=exclude))
+    if not due:
+        return [], None, False
+
+    lag = now - due[0].next_check_at
+    reported = report_lag and lag > settings.SCHEDULE_LAG_WARN * period
+    if reported:
+        backlog = count_due(now)
+        logger.warning(
+            f"Плановая проверка отстаёт от графика на {lag:.0f} с "
+            f"(интервал {period} с), в очереди пользователей: {backlog}"
+        )
+        insert("data", {
+            "type": "schedule_lag",
+            "lag": lag,
+            "backlog": backlog,
+            "period": period,
+            "timestamp": now
+        })
+
+    batch = []
+    for user in due[:max(free, 0)]:
+        # Неактивных и всех ночью проверяем реже: браузеры нужнее там, где что‑то меняется
+        tier = tiers.tier(user.telegram_id, now)
+        user.next_check_at = _next_slot(
+            user.next_check_at, now, period * tiers.factor(tier, now), settings.SCHEDULE_JITTER
+        )
+        batch.append((user, tier))
+    return batch, lag, reported
+
+
+def _next_slot(due: float, now: float, period: float, jitter: float) -> float:
+    """
+    Следующий срок: через интервал от прошлого срока со сдвигом ±jitter интервала.
+    Если отстали больше чем на интервал, срок выбирается заново в пределах интервала,
+    чтобы догоняющие пользователи не шли одной пачкой.
+    """
+    slot = due + period * (1 + random.uniform(-jitter, jitter))
+    if slot <= now:
+        slot = now + random.uniform(0, period)
+    return slot
+
+
+async def background_timetable_prefetch(app):
+    """
+    Раз в сутки в часы TIMETABLE_PREFETCH_HOURS заранее обновляет расписания всех групп.
+    """
+    settings = Settings()
+    scraper = Scraper(settings)
+    start, end = settings.TIMETABLE_PREFETCH_HOURS
+    last_day = None
 
     while True:
-        await scheduled_check(app, settings, scraper, encryptor)
-        await asyncio.sleep(get_schedule_interval() * 60)
+        now = datetime.now(tz=MOSCOW_TZ)
+        if start <= now.hour < end and now.date() != last_day:
+            last_day = now.date()
+            try:
+                await asyncio.to_thread(scraper.timetables.prefetch)
+            except Exception as e:
+                logger.exception(f"Ошибка при обновлении расписаний групп: {e}")
+        await asyncio.sleep(15 * 60)
+
+
+async def background_groups_catalog(app):
+    """
+    Пересобирает каталог групп, когда он старше GROUPS_CATALOG_INTERVAL. Как и обновление
+    расписаний, сборка идёт только в часы TIMETABLE_PREFETCH_HOURS — в том числе самая первая,
+    при пустом каталоге: сотни сочетаний COURSES_MAP не должны занимать браузеры днём.
+    """
+    settings = Settings()
+    scraper = Scraper(settings)
+    start, end = settings.TIMETABLE_PREFETCH_HOURS
+
+    while True:
+        now = datetime.now(tz=MOSCOW_TZ)
+        if start <= now.hour < end and await asyncio.to_thread(catalog_age) >= settings.GROUPS_CATALOG_INTERVAL:
+            try:
+                await asyncio.to_thread(build_catalog, scraper, settings)
+            except Exception as e:
+                logger.exception(f"Ошибка при сборке каталога групп: {e}")
+        await asyncio.sleep(15 * 60)
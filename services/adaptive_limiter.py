@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+class AdaptiveLimiter:
+    """
+    Ограничитель параллельных проверок с AIMD‑подстройкой лимита.
+    Scraper сообщает задержку и исход каждой загруженной страницы (record),
+    лимит растёт на 1, пока сглаженная задержка и доля ошибок в норме и все слоты заняты,
+    и уменьшается вдвое (не чаще раза в cooldown секунд), когда LMS начинает тормозить.
+    Лимит держится в [floor, ceiling] и стартует с initial.
+
+    Слот берётся acquire() на этапе session конвейера проверки и отпускается release()
+    в конце этапа fetch; acquire() может ждать в любом event loop, а record() вызывается
+    из рабочих потоков, поэтому состояние защищено обычным threading.Lock.
+    """
+
+    alpha = 0.2
+    backoff = 0.5
+    cooldown = 10.0
+
+    def __init__(self, floor: int, ceiling: int, initial: int, target_latency: float, max_error_rate: float):
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self._limit = min(max(initial, self.floor), self.ceiling)
+        self._inflight = 0
+        self._latency = None
+        self._errors = 0.0
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def latency(self) -> float | None:
+        """
+        Сглаженная задержка загрузки страницы LMS, с.
+        """
+        return self._latency
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._inflight < self._limit:
+                    self._inflight += 1
+                    return
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            await future
+
+    def release(self):
+        with self._lock:
+            self._inflight -= 1
+            waiters = self._take_waiters()
+        self._wake(waiters)
+
+    def record(self, latency: float, ok: bool = True):
+        """
+        Результат одной загрузки страницы: задержка в секундах и успех.
+        """
+        waiters = []
+        with self._lock:
+            self._latency = latency if self._latency is None else (1 - self.alpha) * self._latency + self.alpha * latency
+            self._errors = (1 - self.alpha) * self._errors + self.alpha * (0.0 if ok else 1.0)
+            self._samples += 1
+
+            now = time.monotonic()
+            if self._latency > self.target_latency or self._errors > self.max_error_rate:
+                if now - self._last_decrease >= self.cooldown and self._limit > self.floor:
+                    self._limit = max(self.floor, int(self._limit * self.backoff))
+                    self._last_decrease = now
+                    logger.info(
+                        f"LMS тормозит ({self._latency:.1f} с, ошибок {self._errors:.0%}) — "
+                        f"лимит проверок снижен до {self._limit}"
+                    )
+                self._samples = 0
+            elif self._samples >= self._limit:
+                # Повышаем только под нагрузкой: без очереди лишний слот ничего не проверит
+                if self._limit < self.ceiling and self._inflight >= self._limit:
+                    self._limit += 1
+                    logger.info(f"Лимит проверок повышен до {self._limit} ({self._latency:.1f} с на страницу)")
+                    waiters = self._take_waiters()
+                self._samples = 0
+        self._wake(waiters)
+
+    def _take_waiters(self) -> list:
+        # Будим всех: каждый заново проверит свободные слоты под lock
+        waiters, self._waiters = self._waiters, []
+        return waiters
+
+    @staticmethod
+    def _wake(waiters):
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+
+def get_limiter(settings) -> AdaptiveLimiter:
+    """
+    Один ограничитель на процесс: задержки страниц от всех клиентов LMS влияют на общий лимит.
+    Проверке через selenium больше браузеров, чем в пуле, не получить, поэтому верхняя граница
+    тогда не выше MAX_CONCURRENT_CHECKS. Стартует лимит с CHECKS_INITIAL (по умолчанию MAX_CONCURRENT_CHECKS,
+    как до адаптивного лимита): сразу на полную мощность, а если LMS тормозит — AIMD снижает.
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            ceiling = settings.CHECKS_MAX
+            if settings.SCRAPER_BACKENDS.get("check", "selenium") == "selenium":
+                ceiling = min(ceiling, settings.MAX_CONCURRENT_CHECKS)
+            _shared_limiter = AdaptiveLimiter(
+                floor=settings.CHECKS_MIN,
+                ceiling=ceiling,
+                initial=settings.CHECKS_INITIAL,
+                target_latency=settings.CHECK_LATENCY_TARGET,
+                max_error_rate=settings.CHECK_ERROR_RATE_MAX,
+            )
+        return _shared_limiter
@@ -0,0 +1,223 @@
+import logging
+import threading
+
+from selenium.webdriver.remote.webelement import WebElement
+
+logger = logging.getLogger(__name__)
+
+
+class SharedBrowser:
+    """
+    Один процесс Chrome, в котором живут контексты нескольких пользователей.
+    WebDriver‑сессия у процесса одна, поэтому команды идут под lock,
+    а current — окно, на которое драйвер переключён сейчас.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.lock = threading.RLock()
+        self.current = driver.current_window_handle
+        self.active = 0
+        self.uses = 0
+        self.retired = False
+
+
+class ContextDriver:
+    """
+    Инкогнито‑контекст (Target.createBrowserContext) в общем браузере, который
+    для Scraper выглядит как отдельный WebDriver: свои куки, хранилища и вкладки.
+    Перед каждой командой берётся lock браузера и драйвер переключается на текущую
+    вкладку контекста; найденные элементы привязываются к контексту, а не к драйверу.
+    """
+
+    def __init__(self, browser: SharedBrowser):
+        self._browser = browser
+        with browser.lock:
+            self.context_id = browser.driver.execute_cdp_cmd(
+                "Target.createBrowserContext", {}
+            )["browserContextId"]
+        self._handles: list[str] = []
+        self._current = None
+        self._new_target()
+
+    @property
+    def window_handles(self) -> list[str]:
+        return list(self._handles)
+
+    @property
+    def current_window_handle(self) -> str:
+        return self._current
+
+    @property
+    def switch_to(self):
+        return _ContextSwitchTo(self)
+
+    def close(self):
+        """
+        Закрывает текущую вкладку контекста.
+        """
+        with self._browser.lock:
+            self._browser.driver.execute_cdp_cmd("Target.closeTarget", {"targetId": self._current})
+            self._handles.remove(self._current)
+            if self._browser.current == self._current:
+                self._browser.current = None
+
+    def dispose(self):
+        """
+        Удаляет контекст вместе со всеми его вкладками и куки.
+        """
+        with self._browser.lock:
+            if self._browser.current in self._handles:
+                self._browser.current = None
+            self._handles.clear()
+            self._browser.driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": self.context_id})
+
+    quit = dispose
+
+    def _new_target(self, new_window: bool = False):
+        with self._browser.lock:
+            target = self._browser.driver.execute_cdp_cmd("Target.createTarget", {
+                "url": "about:blank",
+                "browserContextId": self.context_id,
+                "newWindow": new_window,
+            })
+        self._handles.append(target["targetId"])
+        self._current = target["targetId"]
+
+    def _activate(self):
+        if self._browser.current != self._current:
+            self._browser.driver.switch_to.window(self._current)
+            self._browser.current = self._current
+
+    def _adopt(self, value):
+        """
+        Элементы, которые вернул драйвер, перепривязываются к контексту,
+        чтобы их собственные команды (click, text…) тоже шли через lock и нужную вкладку.
+        """
+        if isinstance(value, WebElement):
+            return WebElement(self, value.id)
+        if isinstance(value, list):
+            return [self._adopt(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self._adopt(v) for k, v in value.items()}
+        return value
+
+    def _locked(self, method):
+        def call(*args, **kwargs):
+            with self._browser.lock:
+                self._activate()
+                return self._adopt(method(*args, **kwargs))
+        return call
+
+    def __getattr__(self, name):
+        if name in ("_browser", "_handles", "_current"):
+            raise AttributeError(name)
+        with self._browser.lock:
+            self._activate()
+            value = getattr(self._browser.driver, name)
+        return self._locked(value) if callable(value) else self._adopt(value)
+
+
+class _ContextSwitchTo:
+    def __init__(self, context: ContextDriver):
+        self._context = context
+
+    def window(self, handle: str):
+        if handle not in self._context._handles:
+            raise RuntimeError(f"Вкладка {handle} не принадлежит контексту")
+        self._context._current = handle
+
+    def new_window(self, type_hint: str | None = None):
+        self._context._new_target(new_window=type_hint == "window")
+
+    def __getattr__(self, name):
+        # frame, alert, default_content и пр. — как у обычного драйвера, но в своей вкладке
+        context = self._context
+        with context._browser.lock:
+            context._activate()
+            value = getattr(context._browser.driver.switch_to, name)
+        return context._locked(value) if callable(value) else value
+
+
+class ContextPool:
+    """
+    Замена DriverPool с тем же интерфейсом acquire()/release():
+    до `browsers` процессов Chrome, в каждом до `contexts` изолированных контекстов.
+    Процесс пересоздаётся после max_uses контекстов (когда в нём никого не осталось)
+    или если перестал отвечать.
+    """
+
+    def __init__(self, factory, disposer, prepare, browsers: int, contexts: int, max_uses: int, timeout: float):
+        self._factory = factory
+        self._disposer = disposer
+        self._prepare = prepare
+        self._max_browsers = browsers
+        self._contexts = contexts
+        self._max_uses = max_uses
+        self._timeout = timeout
+        self._slots = threading.BoundedSemaphore(browsers * contexts)
+        self._browsers: list[SharedBrowser] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, borrower: str = "pool") -> ContextDriver:
+        # Процесс делят несколько контекстов, поэтому заёмщик на уровне браузера не отмечается
+        if not self._slots.acquire(timeout=self._timeout):
+            raise RuntimeError("Нет свободного контекста браузера")
+        browser = None
+        try:
+            browser = self._pick()
+            context = ContextDriver(browser)
+            self._prepare(context)
+            return context
+        except Exception:
+            if browser is not None:
+                browser.retired = True
+                self._leave(browser)
+            self._slots.release()
+            raise
+
+    def release(self, context: ContextDriver):
+        try:
+            try:
+                context.dispose()
+            except Exception as e:
+                logger.warning(f"Не удалось удалить контекст браузера: {e}")
+                context._browser.retired = True
+            self._leave(context._browser)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            browsers, self._browsers = self._browsers, []
+        for browser in browsers:
+            self._disposer(browser.driver)
+
+    def _pick(self) -> SharedBrowser:
+        with self._lock:
+            # Отслужившие и сломанные процессы новых контекстов не получают
+            self._browsers = [b for b in self._browsers if not b.retired]
+            candidates = [b for b in self._browsers if b.active < self._contexts]
+            if candidates:
+                browser = min(candidates, key=lambda b: b.active)
+            elif len(self._browsers) < self._max_browsers:
+                browser = SharedBrowser(self._factory())
+                self._browsers.append(browser)
+            else:
+                raise RuntimeError("Все процессы браузера заняты")
+            browser.active += 1
+            browser.uses += 1
+            if browser.uses >= self._max_uses:
+                browser.retired = True
+            return browser
+
+    def _leave(self, browser: SharedBrowser):
+        with self._lock:
+            browser.active -= 1
+            done = browser.retired and browser.active == 0
+        if done:
+            logger.info(f"Браузер отработал {browser.uses} контекстов, пересоздаём")
+            try:
+                self._disposer(browser.driver)
+            except Exception as e:
+                logger.warning(f"Не удалось закрыть браузер: {e}")
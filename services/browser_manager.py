@@ -0,0 +1,330 @@
+import logging
+import os
+import re
+import shutil
+import signal
+import tempfile
+import threading
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from core.db import insert
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PREFIX = "chrome-"
+# Каждый процесс бота держит профили в своём подкаталоге pid-<pid>: уборщик не трогает чужие живые браузеры
+PROCESS_PREFIX = "pid-"
+# /proc есть только на Linux; на Windows (dev) учёт процессов и уборка сирот отключены
+HAS_PROC = os.path.isdir("/proc")
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+
+class BrowserRecord:
+    """
+    Учётная запись живого браузера: чей он, где профиль, pid chromedriver и пиковый RSS.
+    borrower и leased_at — кто держит браузер сейчас и с какого момента;
+    браузер из пула между выдачами свободен (None), разовый выдан с момента создания.
+    """
+
+    def __init__(self, owner: str, profile_dir: str, persistent: bool):
+        self.owner = owner
+        self.profile_dir = profile_dir
+        self.persistent = persistent
+        self.created_at = time.time()
+        self.borrower = None if persistent else owner
+        self.leased_at = None if persistent else self.created_at
+        self.pid = None
+        self.peak_rss = 0
+
+
+class BrowserManager:
+    """
+    Единая точка создания и закрытия WebDriver.
+    Каждый браузер получает свой user-data-dir в BROWSER_PROFILE_DIR/pid-<pid>, запоминается
+    владелец, текущий заёмщик, возраст и пиковый RSS дерева процессов chromedriver → chrome.
+    Фоновый поток раз в BROWSER_REAP_INTERVAL секунд:
+      - обновляет пиковый RSS живых браузеров;
+      - закрывает «утёкшие» браузеры, выданные дольше BROWSER_LEAK_AGE назад (см. lease());
+      - добивает процессы и удаляет профили своего подкаталога, которые не принадлежат
+        ни одному живому браузеру, и подкаталоги завершившихся процессов бота
+        (остатки падений и прошлых запусков). Профили других живых процессов не трогаются.
+    """
+
+    def __init__(self, settings):
+        self.root_dir = settings.BROWSER_PROFILE_DIR
+        self.base_dir = os.path.join(self.root_dir, f"{PROCESS_PREFIX}{os.getpid()}")
+        self.leak_age = settings.BROWSER_LEAK_AGE
+        self.reap_interval = settings.BROWSER_REAP_INTERVAL
+        self._live: dict[int, tuple] = {}
+        self._starting: set[str] = set()
+        self._lock = threading.Lock()
+        # Путь профиля в командной строке и pid процесса бота, которому он принадлежит
+        self._profile_re = re.compile(
+            re.escape(os.path.join(self.root_dir, PROCESS_PREFIX)) + r"(\d+)"
+            + re.escape(os.sep + PROFILE_PREFIX) + r"[^\s/\\]+"
+        )
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.reap()
+        threading.Thread(target=self._reaper, name="browser-reaper", daemon=True).start()
+
+    def create(self, options, owner: str, persistent: bool = False) -> webdriver.Chrome:
+        """
+        Запускает Chrome с отдельным профилем. persistent — браузер живёт долго
+        (пул) и под правило утечки не попадает.
+        """
+        with self._lock:
+            # Профиль создаётся и регистрируется под одной блокировкой: иначе уборщик, успевший
+            # между mkdtemp и регистрацией снять список известных профилей, удалил бы его как сироту
+            profile_dir = tempfile.mkdtemp(prefix=PROFILE_PREFIX, dir=self.base_dir)
+            self._starting.add(profile_dir)
+        options.add_argument(f"--user-data-dir={profile_dir}")
+        # Лог chromedriver лежит в профиле: по пути в командной строке находим и его процесс
+        service = Service(log_output=os.path.join(profile_dir, "chromedriver.log"))
+        try:
+            driver = webdriver.Chrome(options=options, service=service)
+        except Exception:
+            with self._lock:
+                self._starting.discard(profile_dir)
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+
+        record = BrowserRecord(owner=owner, profile_dir=profile_dir, persistent=persistent)
+        try:
+            record.pid = driver.service.process.pid
+        except AttributeError:
+            pass
+        with self._lock:
+            self._starting.discard(profile_dir)
+            self._live[id(driver)] = (driver, record)
+        return driver
+
+    def quit(self, driver):
+        """
+        Закрывает браузер, добивает оставшиеся процессы, удаляет профиль
+        и пишет в статистику возраст, пиковый RSS и размер профиля.
+        """
+        with self._lock:
+            driver, record = self._live.pop(id(driver), (driver, None))
+        if record is not None:
+            self._sample(record)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"driver.quit() завершился ошибкой: {e}")
+        if record is None:
+            return
+
+        if HAS_PROC:
+            # chrome, переживший quit(), узнаём по пути профиля в командной строке
+            self._kill([
+                pid for pid, (_, cmdline) in _proc_table().items()
+                if record.profile_dir in cmdline and _is_browser(cmdline)
+            ])
+        size = _dir_size(record.profile_dir)
+        shutil.rmtree(record.profile_dir, ignore_errors=True)
+        insert("data", {
+            "type": "driver_quit",
+            "owner": record.owner,
+            "borrower": record.borrower,
+            "age": time.time() - record.created_at,
+            "peak_rss": record.peak_rss,
+            "profile_size": size,
+            "timestamp": time.time(),
+        })
+
+    def lease(self, driver, borrower: str | None):
+        """
+        Отмечает, кто взял браузер (borrower) или что он вернулся (None).
+        Правило утечки считает возраст от момента выдачи: браузер пула, который
+        держат дольше BROWSER_LEAK_AGE, закрывается так же, как разовый.
+        """
+        with self._lock:
+            _, record = self._live.get(id(driver), (None, None))
+            if record is not None:
+                record.borrower = borrower
+                record.leased_at = time.time() if borrower else None
+
+    def stats(self) -> list[dict]:
+        """
+        Живые браузеры: владелец, текущий заёмщик, возраст (с), пиковый RSS (байт).
+        """
+        with self._lock:
+            records = [record for _, record in self._live.values()]
+        now = time.time()
+        return [
+            {"owner": r.owner, "borrower": r.borrower, "age": now - r.created_at, "peak_rss": r.peak_rss}
+            for r in records
+        ]
+
+    def reap(self):
+        with self._lock:
+            live = list(self._live.values())
+
+        for _, record in live:
+            self._sample(record)
+        for driver, record in live:
+            leased_at = record.leased_at
+            if leased_at is None:
+                continue
+            held = time.time() - leased_at
+            if held > self.leak_age:
+                logger.warning(f"Браузер «{record.owner}» занят «{record.borrower}» уже {held:.0f} с — закрываем как утечку")
+                self.quit(driver)
+
+        # Процессы — до снимка известных профилей: браузер, запущенный позже, в таблицу не попадёт,
+        # а каталоги — под той же блокировкой, что и create(): профиль, созданный позже, в список не попадёт
+        table = _proc_table() if HAS_PROC else {}
+        with self._lock:
+            known = {record.profile_dir for _, record in self._live.values()} | self._starting
+            stale = [
+                os.path.join(self.base_dir, name) for name in os.listdir(self.base_dir)
+                if name.startswith(PROFILE_PREFIX) and os.path.join(self.base_dir, name) not in known
+            ]
+        # Подкаталоги других процессов бота убираются только после их завершения;
+        # без /proc (Windows) живость не проверить — их не трогаем
+        if HAS_PROC:
+            stale += [
+                os.path.join(self.root_dir, name) for name in os.listdir(self.root_dir)
+                if name.startswith(PROCESS_PREFIX) and name[len(PROCESS_PREFIX):].isdigit()
+                and not _alive(int(name[len(PROCESS_PREFIX):]))
+            ]
+            orphans = []
+            own = os.getpid()
+            for pid, (_, cmdline) in table.items():
+                match = self._profile_re.search(cmdline)
+                if not match or not _is_browser(cmdline):
+                    continue
+                bot_pid = int(match.group(1))
+                if bot_pid == own:
+                    orphan = match.group(0) not in known
+                else:
+                    orphan = not _alive(bot_pid)
+                if orphan:
+                    orphans.append(pid)
+            if orphans:
+                logger.warning(f"Найдено {len(orphans)} процессов браузеров‑сирот, завершаем")
+                self._kill(orphans)
+
+        for path in stale:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _reaper(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.warning(f"Ошибка при уборке браузеров: {e}")
+
+    def _sample(self, record: BrowserRecord):
+        if not HAS_PROC or not record.pid:
+            return
+        rss = sum(_rss(pid) for pid in self._tree(record.pid, _proc_table()))
+        record.peak_rss = max(record.peak_rss, rss)
+
+    @staticmethod
+    def _tree(root: int, table: dict[int, tuple[int, str]]) -> list[int]:
+        pids, frontier = [], [root]
+        while frontier:
+            pid = frontier.pop()
+            if pid in table:
+                pids.append(pid)
+                frontier += [child for child, (ppid, _) in table.items() if ppid == pid]
+        return pids
+
+    @staticmethod
+    def _kill(pids: list[int]):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                continue
+            # chromedriver — наш дочерний процесс: забираем его статус, чтобы не копить зомби
+            for _ in range(20):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        break
+                except ChildProcessError:
+                    break
+                time.sleep(0.05)
+
+
+def _proc_table() -> dict[int, tuple[int, str]]:
+    """
+    {pid: (ppid, командная строка)} по /proc.
+    """
+    table = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{name}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        except (OSError, ValueError, IndexError):
+            continue
+        table[int(name)] = (ppid, cmdline)
+    return table
+
+
+def _alive(pid: int) -> bool:
+    """
+    Жив ли процесс с этим pid (только при наличии /proc).
+    """
+    return os.path.isdir(f"/proc/{pid}")
+
+
+def _is_browser(cmdline: str) -> bool:
+    """
+    chrome, chromium, chromedriver и вспомогательные процессы chrome — но не, скажем, shell,
+    в чьей командной строке случайно упомянут путь профиля.
+    """
+    return "chrom" in os.path.basename(cmdline.split(" ", 1)[0])
+
+
+def _rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def get_manager(settings) -> BrowserManager:
+    """
+    Один менеджер на процесс, как и пул драйверов.
+    """
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = BrowserManager(settings)
+        return _shared_manager
+
+
+def current_manager() -> BrowserManager | None:
+    """
+    Уже созданный менеджер или None — для тех, кому браузеры не нужны (веб‑админка):
+    менеджер и поток уборщика создаёт только тот, кто запускает браузеры.
+    """
+    with _shared_lock:
+        return _shared_manager
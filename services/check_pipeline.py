@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from services.extractors import use_parser
+
+logger = logging.getLogger(__name__)
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+class Stage:
+    """
+    Этап конвейера: своя ограниченная очередь и workers обработчиков.
+    handler(item) возвращает элемент для следующего этапа или None — элемент дальше не идёт.
+    backlog() — необязательно: сколько работы ждёт внутри этапа помимо его очереди.
+    """
+
+    def __init__(self, name: str, handler, workers: int, maxsize: int, backlog=None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.backlog = backlog
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.busy = 0
+        self.done = 0
+        self.busy_time = 0.0
+
+
+class Pipeline:
+    """
+    Цепочка этапов, связанных ограниченными очередями asyncio.Queue.
+    submit() кладёт элемент в первый этап и возвращает future, который завершается
+    этим же элементом, когда он прошёл все этапы, был отброшен или упал с ошибкой
+    (ошибка пишется в лог с именем этапа). Заполненная очередь притормаживает предыдущий этап.
+    snapshot() — глубина очередей (и backlog этапов), занятые обработчики и пропускная способность этапов.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.stages: list[Stage] = []
+        self._workers: list[asyncio.Task] = []
+        self._since = time.time()
+
+    def stage(self, name: str, handler, workers: int, backlog=None):
+        self.stages.append(Stage(name, handler, workers, self.queue_size, backlog))
+        return self
+
+    def start(self):
+        for i, stage in enumerate(self.stages):
+            following = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                self._workers.append(asyncio.create_task(self._work(stage, following)))
+        return self
+
+    async def submit(self, item) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        await self.stages[0].queue.put((item, future))
+        return future
+
+    async def run(self, item):
+        """
+        submit() и ожидание результата.
+        """
+        return await (await self.submit(item))
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def snapshot(self, reset: bool = False) -> dict[str, dict]:
+        elapsed = max(time.time() - self._since, 1e-9)
+        stats = {
+            stage.name: {
+                "queue": stage.queue.qsize(),
+                "busy": stage.busy,
+                "done": stage.done,
+                # элементов в минуту и средняя занятость обработчиков этапа
+                "rate": round(stage.done * 60 / elapsed, 1),
+                "load": round(stage.busy_time / (elapsed * stage.workers), 2),
+            }
+            for stage in self.stages
+        }
+        for stage in self.stages:
+            if stage.backlog is not None:
+                stats[stage.name]["backlog"] = stage.backlog()
+        if reset:
+            for stage in self.stages:
+                stage.done = 0
+                stage.busy_time = 0.0
+            self._since = time.time()
+        return stats
+
+    async def _work(self, stage: Stage, following: Stage | None):
+        while True:
+            item, future = await stage.queue.get()
+            stage.busy += 1
+            started = time.perf_counter()
+            result = None
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                logger.exception(f"Этап «{stage.name}» конвейера проверки упал: {e}")
+            finally:
+                stage.busy -= 1
+                stage.busy_time += time.perf_counter() - started
+                stage.done += 1
+                stage.queue.task_done()
+
+            if result is not None and following is not None:
+                await following.queue.put((result, future))
+            elif not future.done():
+                future.set_result(item)
+
+
+class FairWorkQueue:
+    """
+    Мелкие единицы работы (страницы заданий), разложенные по владельцам (проверкам пользователей),
+    которые делят между собой браузеры этапа fetch.
+    take() отдаёт до batch единиц владельца, на которого сейчас работает меньше всего браузеров;
+    при равенстве — того, чья сессия уже в браузере (current), затем по кругу.
+    Так браузер сначала берёт свои страницы, а освободившись — крадёт чужие, и длинная проверка
+    одного пользователя расходится по всем свободным браузерам.
+    Единицы владельца, добавленного с shared=False или вернувшего их через give_back(),
+    берёт только сам владелец.
+    """
+
+    def __init__(self):
+        self._pending: dict = {}
+        self._left: dict = {}
+        self._active: dict = {}
+        self._ring: list = []
+        self._private: set = set()
+        self._changed = asyncio.Condition()
+
+    async def add(self, owner, units: list, shared: bool = True):
+        async with self._changed:
+            self._pending[owner] = deque(units)
+            self._left[owner] = len(units)
+            self._active[owner] = 0
+            self._ring.append(owner)
+            if not shared:
+                self._private.add(owner)
+            self._changed.notify_all()
+
+    def _open_to(self, current, owner) -> bool:
+        return bool(self._pending[owner]) and (owner is current or owner not in self._private)
+
+    async def take(self, current, batch: int):
+        """
+        (владелец, единицы) или None, если невзятых единиц нет ни у кого.
+        """
+        async with self._changed:
+            candidates = [owner for owner in self._ring if self._open_to(current, owner)]
+            if not candidates:
+                return None
+            owner = min(candidates, key=lambda o: (self._active[o], o is not current))
+            # взятый владелец уходит в конец круга
+            self._ring.remove(owner)
+            self._ring.append(owner)
+            pending = self._pending[owner]
+            units = [pending.popleft() for _ in range(min(batch, len(pending)))]
+            self._active[owner] += 1
+            return owner, units
+
+    async def done(self, owner, units: list):
+        async with self._changed:
+            self._active[owner] -= 1
+            self._left[owner] -= len(units)
+            if not self._left[owner]:
+                self._ring.remove(owner)
+                del self._pending[owner], self._left[owner], self._active[owner]
+                self._private.discard(owner)
+            self._changed.notify_all()
+
+    async def give_back(self, owner, units: list):
+        """
+        Взятые, но не выполненные единицы возвращаются владельцу; дальше их берёт только он сам.
+        """
+        async with self._changed:
+            self._active[owner] -= 1
+            self._pending[owner].extendleft(reversed(units))
+            self._private.add(owner)
+            self._changed.notify_all()
+
+    async def wait(self, owner) -> bool:
+        """
+        Ждёт, пока все единицы owner выполнены (True) или появились невзятые, которые он может взять (False).
+        """
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: owner not in self._left or any(self._open_to(owner, o) for o in self._pending)
+            )
+            return owner not in self._left
+
+    def depth(self) -> int:
+        """
+        Сколько единиц ещё не взято ни одним браузером.
+        """
+        return sum(len(pending) for pending in self._pending.values())
+
+
+def get_parse_pool(settings) -> ProcessPoolExecutor:
+    """
+    Один пул процессов на процесс бота: BeautifulSoup разбирает страницы вне GIL планировщика.
+    Создаётся при первой HTML‑странице: браузер и веб‑сервис отдают уже разобранные данные,
+    и без http‑бэкенда пул не нужен вовсе.
+    forkserver — чтобы не форкать процесс с живыми потоками браузеров и пулов; в forkserver
+    заранее грузится только services.extractors, а не __main__ (main.py с настройкой логов).
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["services.extractors"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _shared_pool = ProcessPoolExecutor(
+                max_workers=settings.PARSE_PROCESSES,
+                mp_context=context,
+                initializer=use_parser,
+                initargs=(settings.HTML_PARSER,),
+            )
+        return _shared_pool
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from selenium.common.exceptions import TimeoutException
+
+from core.db import insert
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# Ответ бота, если в конфиге команды нет сообщения lms_unavailable
+LMS_UNAVAILABLE = "🔌 LMS сейчас не отвечает, попробуйте позже."
+# Ошибки, которые говорят о недоступности LMS, а не о конкретной странице или пользователе.
+# TimeoutException сюда доходит только от навигации и document.readyState: элемент, которого нет
+# на загруженной странице, Scraper превращает в LmsPageIncomplete или LmsSessionExpired
+TIMEOUT_ERRORS = (TimeoutException, requests.Timeout, requests.ConnectionError)
+
+
+class LmsUnavailableError(RuntimeError):
+    """Предохранитель разомкнут — к LMS сейчас не обращаемся."""
+
+
+_shared_breaker = None
+_shared_lock = threading.Lock()
+
+
+class LmsCircuitBreaker:
+    """
+    Общий для планировщика и бота предохранитель от недоступной LMS.
+      - closed: всё работает; BREAKER_TIMEOUTS таймаутов за BREAKER_WINDOW секунд
+        или неудачная проба размыкают цепь;
+      - open: работа с LMS не начинается, allow() сразу отвечает False;
+      - half_open: через BREAKER_COOLDOWN секунд один поток делает пробу,
+        остальные по‑прежнему получают False; удачная проба замыкает цепь.
+    probe — дешёвая проверка доступности LMS, возвращает bool.
+    """
+
+    def __init__(self, probe, timeouts: int, window: float, cooldown: float):
+        self._probe = probe
+        self.timeouts = timeouts
+        self.window = window
+        self.cooldown = cooldown
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._failures = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN or time.time() - self._opened_at < self.cooldown:
+                return False
+            self._state = HALF_OPEN
+        return self.check()
+
+    def ready(self) -> bool:
+        """
+        allow() со свежей пробой — перед пачкой работы вроде плановой проверки.
+        """
+        with self._lock:
+            closed = self._state == CLOSED
+        return self.check() if closed else self.allow()
+
+    def check(self) -> bool:
+        """
+        Проба LMS: успех замыкает цепь, неудача размыкает её на BREAKER_COOLDOWN.
+        """
+        try:
+            ok = bool(self._probe())
+        except Exception as e:
+            logger.warning(f"Проба LMS завершилась ошибкой: {e}")
+            ok = False
+        with self._lock:
+            if ok:
+                if self._state != CLOSED:
+                    logger.info("LMS снова отвечает — продолжаем работу")
+                self._state = CLOSED
+                self._failures.clear()
+            else:
+                self._trip("проба не прошла")
+        return ok
+
+    def record(self, error: Exception | None = None):
+        """
+        Исход одной загрузки страницы; в счёт идут только таймауты и обрывы соединения.
+        """
+        if not isinstance(error, TIMEOUT_ERRORS):
+            return
+        now = time.time()
+        with self._lock:
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window:
+                self._failures.popleft()
+            if self._state == CLOSED and len(self._failures) >= self.timeouts:
+                self._trip(f"{len(self._failures)} таймаутов за {self.window:.0f} с")
+
+    def _trip(self, reason: str):
+        if self._state != OPEN:
+            logger.warning(f"LMS недоступна ({reason}) — приостанавливаем обращения на {self.cooldown:.0f} с")
+            insert("data", {"type": "lms_circuit_open", "reason": reason, "timestamp": time.time()})
+        self._state = OPEN
+        self._opened_at = time.time()
+        self._failures.clear()
+
+
+def get_breaker(settings, probe) -> LmsCircuitBreaker:
+    """
+    Один предохранитель на процесс: таймауты бота и планировщика копятся вместе.
+    """
+    global _shared_breaker
+    with _shared_lock:
+        if _shared_breaker is None:
+            _shared_breaker = LmsCircuitBreaker(
+                probe,
+                timeouts=settings.BREAKER_TIMEOUTS,
+                window=settings.BREAKER_WINDOW,
+                cooldown=settings.BREAKER_COOLDOWN,
+            )
+        return _shared_breaker
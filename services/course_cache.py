@@ -0,0 +1,64 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class CourseListCache:
+    """
+    Список курсов пользователя, сохранённый в его документе с TTL.
+    Свежий список отдаётся сразу, устаревший — тоже сразу, но обновляется в фоне
+    отдельным клиентом LMS. Хеш списка показывает, менялась ли запись на курсы.
+    """
+
+    def __init__(self, scraper, ttl: int):
+        self.scraper = scraper
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="course-cache")
+        self._refreshing: set[int] = set()
+        self._lock = threading.Lock()
+
+    def get(self, user, client) -> list[str]:
+        cached = user.courses or {}
+        if cached.get("links") is None:
+            return self.refresh(user, client)
+        if time.time() - cached.get("fetched_at", 0) >= self.ttl:
+            self._refresh_later(user)
+        return cached["links"]
+
+    def refresh(self, user, client) -> list[str]:
+        links = self.scraper.get_course_links(client)
+        digest = hashlib.sha1("\n".join(sorted(links)).encode()).hexdigest()
+        cached = user.courses or {}
+        if cached.get("hash") != digest:
+            if cached.get("hash"):
+                logger.info(f"[{user.telegram_id}] Список курсов изменился: {len(links)} курсов")
+            user.courses = {"links": links, "hash": digest, "fetched_at": time.time()}
+        else:
+            user.courses = {**cached, "fetched_at": time.time()}
+        return links
+
+    def _refresh_later(self, user):
+        with self._lock:
+            if user.telegram_id in self._refreshing:
+                return
+            self._refreshing.add(user.telegram_id)
+        self._executor.submit(self._background_refresh, user)
+
+    def _background_refresh(self, user):
+        try:
+            pwd = self.scraper.encryptor.decrypt(user.mtuci_password)
+
+            def job(client):
+                self.scraper.login(client, user.mtuci_login, pwd)
+                return self.refresh(user, client)
+
+            self.scraper.run("tasks", job)
+        except Exception as e:
+            logger.warning(f"[{user.telegram_id}] Не удалось обновить список курсов: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(user.telegram_id)
@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+from core.db import insert
+from services.browser_contexts import ContextPool
+
+logger = logging.getLogger(__name__)
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+class DriverPool:
+    """
+    Ограниченный пул «тёплых» WebDriver.
+    Драйвер выдаётся через acquire() и возвращается через release(),
+    между пользователями очищаются куки и хранилища, после max_uses выдач
+    или при сбое драйвер пересоздаётся.
+    lease(driver, borrower) сообщает, кто взял драйвер, и lease(driver, None) — что он вернулся.
+    """
+
+    def __init__(self, factory, disposer, size: int, max_uses: int, origins: list[str], timeout: float,
+                 lease=None):
+        self._factory = factory
+        self._disposer = disposer
+        self._lease = lease or (lambda driver, borrower: None)
+        self._max_uses = max_uses
+        self._origins = origins
+        self._timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, borrower: str = "pool"):
+        if not self._slots.acquire(timeout=self._timeout):
+            raise RuntimeError("Нет свободного браузера в пуле")
+        try:
+            while True:
+                try:
+                    driver = self._idle.get_nowait()
+                except queue.Empty:
+                    driver = self._factory()
+                    with self._lock:
+                        self._uses[id(driver)] = 0
+                    self._lease(driver, borrower)
+                    return driver
+                if self._healthy(driver):
+                    self._lease(driver, borrower)
+                    return driver
+                logger.warning("Драйвер из пула не отвечает, пересоздаём")
+                self._discard(driver)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, driver):
+        self._lease(driver, None)
+        try:
+            with self._lock:
+                uses = self._uses.get(id(driver), 0) + 1
+                self._uses[id(driver)] = uses
+            if uses >= self._max_uses:
+                logger.info(f"Драйвер отработал {uses} выдач, пересоздаём")
+                self._discard(driver)
+            elif not self._reset(driver):
+                self._discard(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _healthy(driver) -> bool:
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _reset(self, driver) -> bool:
+        """
+        Возвращает драйвер в «чистое» состояние: одна вкладка about:blank,
+        без куки и хранилищ прошлого пользователя.
+        """
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.get("about:blank")
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            for origin in self._origins:
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось очистить драйвер: {e}")
+            return False
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            self._disposer(driver)
+        except Exception as e:
+            logger.warning(f"Не удалось закрыть драйвер: {e}")
+        insert("data", {"type": "driver_recycle", "timestamp": time.time()})
+
+
+def get_pool(settings, factory, disposer, prepare, lease=None) -> DriverPool | ContextPool:
+    """
+    Один пул на процесс: бот, планировщик и ручная проверка делят одни и те же браузеры.
+    С BROWSER_CONTEXTS > 0 вместо браузера на пользователя выдаются инкогнито‑контексты
+    в MAX_CONCURRENT_BROWSERS общих процессах; prepare(context) настраивает новый контекст.
+    lease отмечает выдачу и возврат браузера в DriverPool (для правила утечки).
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None and settings.BROWSER_CONTEXTS > 0:
+            _shared_pool = ContextPool(
+                factory,
+                disposer,
+                prepare,
+                browsers=settings.MAX_CONCURRENT_BROWSERS,
+                contexts=settings.BROWSER_CONTEXTS,
+                max_uses=settings.DRIVER_MAX_USES,
+                timeout=settings.DRIVER_POOL_TIMEOUT,
+            )
+        if _shared_pool is None:
+            origins = sorted({
+                "{0.scheme}://{0.netloc}".format(urlsplit(url))
+                for url in (settings.BASE_URL, settings.TIME_TABLE_URL)
+            })
+            _shared_pool = DriverPool(
+                factory,
+                disposer,
+                size=settings.MAX_CONCURRENT_BROWSERS,
+                max_uses=settings.DRIVER_MAX_USES,
+                origins=origins,
+                timeout=settings.DRIVER_POOL_TIMEOUT,
+                lease=lease,
+            )
+        return _shared_pool
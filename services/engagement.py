@@ -0,0 +1,66 @@
+import time
+from datetime import datetime
+
+from core.db import get_collection
+from core.models.tasks import last_changed_by_user
+from services.moodle_ws import MOSCOW_TZ
+
+DAY = 24 * 3600
+TIERS = ("active", "regular", "dormant")
+
+
+class EngagementTiers:
+    """
+    Как часто проверять пользователя в зависимости от его вовлечённости (множитель интервала):
+      - active: команда боту или изменение задания за последние USER_TIER_DAYS[0] дней;
+      - regular: за последние USER_TIER_DAYS[1] дней;
+      - dormant: все остальные.
+    Множители — USER_TIER_FACTORS по порядку. В тихие часы CHECK_QUIET_HOURS (МСК)
+    множитель не меньше CHECK_QUIET_FACTOR для всех.
+    Активность берётся из событий command в data и last_updated заданий и
+    пересчитывается не чаще раза в refresh_interval секунд.
+    """
+
+    def __init__(self, settings, refresh_interval: float = 600):
+        self.days = settings.USER_TIER_DAYS
+        self.factors = settings.USER_TIER_FACTORS
+        self.quiet_hours = settings.CHECK_QUIET_HOURS
+        self.quiet_factor = settings.CHECK_QUIET_FACTOR
+        self.refresh_interval = refresh_interval
+        self._last_active: dict[int, float] = {}
+        self._refreshed_at = 0.0
+
+    def refresh(self, now: float | None = None):
+        now = now or time.time()
+        since = now - max(self.days) * DAY
+        last = last_changed_by_user(since)
+        for doc in get_collection("data").aggregate([
+            {"$match": {"type": "command", "user_id": {"$exists": True}, "timestamp": {"$gte": since}}},
+            {"$group": {"_id": "$user_id", "last": {"$max": "$timestamp"}}}
+        ]):
+            last[doc["_id"]] = max(last.get(doc["_id"], 0), doc["last"])
+        self._last_active = last
+        self._refreshed_at = now
+
+    def tier(self, telegram_id: int, now: float) -> str:
+        if now - self._refreshed_at >= self.refresh_interval:
+            self.refresh(now)
+        idle = now - self._last_active.get(telegram_id, 0)
+        if idle < self.days[0] * DAY:
+            return "active"
+        if idle < self.days[1] * DAY:
+            return "regular"
+        return "dormant"
+
+    def factor(self, tier: str, now: float) -> float:
+        factor = self.factors[TIERS.index(tier)]
+        if self.quiet(now):
+            factor = max(factor, self.quiet_factor)
+        return factor
+
+    def quiet(self, now: float) -> bool:
+        start, end = self.quiet_hours
+        hour = datetime.fromtimestamp(now, tz=MOSCOW_TZ).hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
@@ -0,0 +1,235 @@
+"""
+Извлечение нужных полей со страниц LMS.
+
+Для браузера каждое извлечение — JS‑скрипт для execute_script, который возвращает
+только нужные данные компактным JSON вместо всего page_source.
+Для HTML (HTTP‑бэкенд) те же структуры строятся через BeautifulSoup.
+Тексты считаются одинаково: stext = get_text(sep, strip=True), text = .text.strip().
+
+HTML разбирается не целиком: SoupStrainer оставляет только поддеревья, из которых
+читает извлекатель. Парсер (html.parser или lxml) выбирается при старте через use_parser().
+"""
+import logging
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+PARSERS = ("html.parser", "lxml")
+_features = "html.parser"
+
+JS_PRELUDE = """
+const strings = (el) => {
+    const out = [];
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT, {
+        acceptNode: n => ['SCRIPT', 'STYLE', 'TEMPLATE'].includes(n.parentNode.nodeName)
+            ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+    });
+    while (walker.nextNode()) out.push(walker.currentNode.data);
+    return out;
+};
+const text = (el) => strings(el).join('').trim();
+const stext = (el, sep = '') => strings(el).map(s => s.trim()).filter(Boolean).join(sep);
+const all = (root, sel) => Array.from(root.querySelectorAll(sel));
+"""
+
+JS_EXTRACTORS = {
+    # Таблица состояния задания: [th, td] в двух вариантах текста + ссылки на файлы
+    "status": """
+const table = document.querySelector('table.generaltable.table-bordered');
+return {
+    rows: table ? all(table, 'tr').map(tr => {
+        const th = tr.querySelector('th'), td = tr.querySelector('td');
+        return th && td ? [stext(th), stext(td), text(th), text(td)] : null;
+    }).filter(Boolean) : null,
+    files: all(document, "a[href*='pluginfile.php']").map(a => a.getAttribute('href'))
+};
+""",
+    # Страница курса: название и задания с датами
+    "course": """
+const h1 = document.querySelector('h1.h2.mb-0');
+return {
+    name: h1 ? text(h1) : null,
+    activities: all(document, 'li.modtype_assign').map(li => {
+        const block = li.querySelector('div.activity-item');
+        const a = block ? block.querySelector('a.aalink[href]') : null;
+        if (!a) return null;
+        return {
+            name: (block.getAttribute('data-activityname') || '').trim(),
+            href: a.getAttribute('href'),
+            dates: all(block, 'div.activity-dates div').map(d => stext(d))
+        };
+    }).filter(Boolean)
+};
+""",
+    # Карточки «Мои курсы»
+    "cards": """
+return all(document, 'div.col.d-flex.px-0.mb-2')
+    .map(div => div.querySelector('a[href]'))
+    .filter(Boolean)
+    .map(a => a.getAttribute('href'));
+""",
+    # Кнопки групп в публичном расписании
+    "groups": """
+const box = document.querySelector('#groups_container');
+return box ? all(box, '.groups-btn').map(d => stext(d)) : [];
+""",
+    # Индекс заданий курса: [ссылка, строка таблицы]
+    "index": """
+return all(document, 'table.generaltable tr').map(tr => {
+    const a = tr.querySelector("a[href*='mod/assign/view.php']");
+    return a ? [a.getAttribute('href'), all(tr, 'td, th').map(c => stext(c, ' ')).join(' | ')] : null;
+}).filter(Boolean);
+""",
+    # Обзор оценок: [ссылка на курс, оценка]
+    "overview": """
+return all(document, 'table#overview-grade tr').map(tr => {
+    const a = tr.querySelector("a[href*='id=']");
+    const cells = tr.querySelectorAll('td');
+    return a && cells.length ? [a.getAttribute('href'), stext(cells[cells.length - 1], ' ')] : null;
+}).filter(Boolean);
+""",
+}
+
+SCRIPTS = {kind: JS_PRELUDE + body for kind, body in JS_EXTRACTORS.items()}
+
+
+def _status(soup):
+    table = soup.select_one("table.generaltable.table-bordered")
+    rows = None
+    if table:
+        rows = []
+        for row in table.select("tr"):
+            th, td = row.find("th"), row.find("td")
+            if th and td:
+                rows.append([th.get_text(strip=True), td.get_text(strip=True), th.text.strip(), td.text.strip()])
+    return {"rows": rows, "files": [a["href"] for a in soup.select("a[href*='pluginfile.php']")]}
+
+
+def _course(soup):
+    h1 = soup.select_one("h1.h2.mb-0")
+    activities = []
+    for li in soup.select("li.modtype_assign"):
+        block = li.select_one("div.activity-item")
+        link = block.select_one("a.aalink[href]") if block else None
+        if not link:
+            continue
+        activities.append({
+            "name": block.get("data-activityname", "").strip(),
+            "href": link["href"],
+            "dates": [d.get_text(strip=True) for d in block.select("div.activity-dates div")],
+        })
+    return {"name": h1.text.strip() if h1 else None, "activities": activities}
+
+
+def _cards(soup):
+    links = []
+    for div in soup.select("div.col.d-flex.px-0.mb-2"):
+        a = div.find("a", href=True)
+        if a:
+            links.append(a["href"])
+    return links
+
+
+def _groups(soup):
+    box = soup.select_one("#groups_container")
+    if not box:
+        return []
+    return [div.get_text(strip=True) for div in box.select(".groups-btn")]
+
+
+def _index(soup):
+    rows = []
+    for row in soup.select("table.generaltable tr"):
+        link = row.select_one("a[href*='mod/assign/view.php']")
+        if link:
+            rows.append([link["href"], " | ".join(c.get_text(" ", strip=True) for c in row.find_all(["td", "th"]))])
+    return rows
+
+
+def _overview(soup):
+    rows = []
+    for row in soup.select("table#overview-grade tr"):
+        link = row.select_one("a[href*='id=']")
+        cells = row.find_all("td")
+        if link and cells:
+            rows.append([link["href"], cells[-1].get_text(" ", strip=True)])
+    return rows
+
+
+def _classes(*names: str) -> re.Pattern:
+    """
+    На этапе разбора class ещё строка "a b c", поэтому ищем класс как отдельное слово.
+    """
+    return re.compile(r"(?:^|\s)(?:%s)(?:\s|$)" % "|".join(map(re.escape, names)))
+
+
+# Поддеревья, которые нужны извлекателю; всё остальное парсер пропускает.
+# Каждое правило шире соответствующего селектора, поэтому результат не меняется.
+PARSE_ONLY = {
+    "status": SoupStrainer(["table", "a"]),
+    "course": SoupStrainer(["h1", "li"], class_=_classes("h2", "modtype_assign")),
+    "cards": SoupStrainer("div", class_=_classes("px-0")),
+    "groups": SoupStrainer(id="groups_container"),
+    "index": SoupStrainer("table", class_=_classes("generaltable")),
+    "overview": SoupStrainer("table", id="overview-grade"),
+}
+
+HTML_EXTRACTORS = {
+    "status": _status,
+    "course": _course,
+    "cards": _cards,
+    "groups": _groups,
+    "index": _index,
+    "overview": _overview,
+}
+
+
+def use_parser(name: str) -> str:
+    """
+    Выбирает парсер для всех последующих разборов. lxml необязателен:
+    если он не установлен, остаётся html.parser.
+    """
+    global _features
+    if name not in PARSERS:
+        logger.warning(f"Неизвестный HTML_PARSER={name!r}, используем html.parser")
+        name = "html.parser"
+    elif name == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            logger.warning("lxml не установлен, используем html.parser")
+            name = "html.parser"
+    _features = name
+    return name
+
+
+def parse_html(html: str, kind: str | None = None) -> BeautifulSoup:
+    """
+    Разбор выбранным парсером; с kind — только поддеревья из PARSE_ONLY[kind].
+    """
+    return BeautifulSoup(html, _features, parse_only=PARSE_ONLY.get(kind))
+
+
+def extract_html(kind: str, html: str):
+    """
+    То же, что вернул бы SCRIPTS[kind] в браузере, но из готового HTML.
+    """
+    return HTML_EXTRACTORS[kind](parse_html(html, kind))
+
+
+def parse_statuses(pages: list[str]) -> list[dict | None]:
+    """
+    Таблицы состояния заданий из HTML страниц: {заголовок: значение} или None, если таблицы нет.
+    Выполняется в пуле процессов конвейера проверки, поэтому ничего, кроме HTML, не получает.
+    """
+    statuses = []
+    for html in pages:
+        try:
+            rows = extract_html("status", html)["rows"]
+        except Exception as e:
+            logger.warning(f"Не удалось разобрать страницу задания: {e}")
+            rows = None
+        statuses.append({row[0]: row[1] for row in rows} if rows is not None else None)
+    return statuses
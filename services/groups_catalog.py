@@ -0,0 +1,54 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.db import insert
+from core.models.config import get_flag, set_flag
+from core.models.groups import save_groups
+
+logger = logging.getLogger(__name__)
+
+
+def combinations(courses_map: dict) -> list[tuple[str, str, str, str]]:
+    """
+    Все сочетания (уровень, форма, факультет, курс) из Settings.COURSES_MAP.
+    """
+    return [
+        (level, form, faculty, course)
+        for level, forms in courses_map.items()
+        for form, faculties in forms.items()
+        for faculty, courses in faculties.items()
+        for course in courses
+    ]
+
+
+def build_catalog(scraper, settings) -> int:
+    """
+    Обходит публичное расписание для каждого сочетания из COURSES_MAP, не больше
+    GROUPS_CATALOG_CONCURRENCY браузеров одновременно. Неудачное сочетание
+    сохраняет прежний список групп. Возвращает число обновлённых сочетаний.
+    """
+    start = time.perf_counter()
+    combos = combinations(settings.COURSES_MAP)
+
+    def build_one(combo) -> bool:
+        try:
+            save_groups(*combo, scraper.get_groups(*combo))
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось получить группы для {' / '.join(combo)}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=settings.GROUPS_CATALOG_CONCURRENCY, thread_name_prefix="groups") as pool:
+        updated = sum(pool.map(build_one, combos))
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Каталог групп обновлён: {updated} из {len(combos)} сочетаний за {elapsed:.1f} с")
+    insert("data", {"type": "groups_catalog", "timestamp": time.time(), "updated": updated, "duration": elapsed})
+    set_flag("groups_catalog_updated_at", time.time())
+    return updated
+
+
+def catalog_age() -> float:
+    return time.time() - get_flag("groups_catalog_updated_at", 0)
+
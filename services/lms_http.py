@@ -0,0 +1,83 @@
+import logging
+import re
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+SESSKEY_RE = re.compile(r'"sesskey":"([^"]+)"')
+
+
+class InvalidCredentialsError(RuntimeError):
+    """LMS отклонила логин/пароль — повторять другим бэкендом бессмысленно."""
+
+
+class LmsSessionExpired(RuntimeError):
+    """LMS перенаправила на страницу входа — сессия недействительна."""
+
+
+class LmsPageIncomplete(RuntimeError):
+    """Страница LMS загрузилась, но нужного элемента на ней нет (скрытое задание, другая разметка)."""
+
+
+class LmsHttpSession:
+    """
+    HTTP‑сессия одного пользователя LMS.
+    Куки (MoodleSession) свои, а соединения берутся из общего keep‑alive пула.
+    """
+
+    def __init__(self, adapter: HTTPAdapter, timeout: float):
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.timeout = timeout
+        self.current_url = None
+        self.sesskey = None
+
+    def _remember(self, resp: requests.Response) -> requests.Response:
+        resp.raise_for_status()
+        self.current_url = resp.url
+        match = SESSKEY_RE.search(resp.text) if "text/html" in resp.headers.get("Content-Type", "") else None
+        if match:
+            self.sesskey = match.group(1)
+        return resp
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        resp = self._remember(self.session.get(url, timeout=self.timeout, **kwargs))
+        if "/login/index.php" in resp.url and "/login/index.php" not in url:
+            raise LmsSessionExpired(f"Сессия LMS недействительна: {url}")
+        return resp
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self._remember(self.session.post(url, timeout=self.timeout, **kwargs))
+
+    def close(self):
+        """
+        Session.close() закрыл бы и общий адаптер, поэтому чистим только куки.
+        """
+        self.session.cookies.clear()
+        self.sesskey = None
+
+
+class LmsHttpPool:
+    """
+    Общий пул соединений к LMS для всех HTTP‑сессий.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=settings.HTTP_POOL_SIZE,
+            max_retries=Retry(total=2, backoff_factor=0.3, allowed_methods=["GET"]),
+        )
+
+    def session(self) -> LmsHttpSession:
+        return LmsHttpSession(self._adapter, self.settings.HTTP_TIMEOUT)
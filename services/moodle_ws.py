@@ -0,0 +1,187 @@
+import logging
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit, parse_qs
+from zoneinfo import ZoneInfo
+
+from services.lms_http import InvalidCredentialsError, LmsHttpSession
+from utils.date_utils import format_duration, format_ts, lms_date
+
+logger = logging.getLogger(__name__)
+
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+# Строки, которые LMS показывает в таблице состояния задания
+RESPONSE_STATUS = {
+    "new": "Ответы на задание еще не представлены",
+    "submitted": "Отправлено для оценивания",
+    "draft": "Черновик (не отправлено)",
+    "reopened": "Открыто повторно",
+}
+GRADE_STATUS = {
+    "graded": "Оценено",
+    "notgraded": "Не оценено",
+}
+# «Оставшееся время» неотправленного задания после срока
+OVERDUE = "Задание просрочено на: {}"
+
+
+class MoodleWsError(RuntimeError):
+    """Ошибка, которую вернул веб‑сервис Moodle."""
+
+
+class MoodleWsClient:
+    """
+    Клиент мобильного веб‑сервиса Moodle (login/token.php + webservice/rest/server.php).
+    Отдаёт те же записи, что Scraper.parse_assignments_from_course, но из JSON:
+    даты и строки состояния — в том виде, в каком их показывает страница LMS.
+    """
+
+    def __init__(self, session: LmsHttpSession, settings):
+        self.session = session
+        self.settings = settings
+        self.base = settings.MOODLE_WS_URL.rstrip("/") + "/"
+        self.token = None
+        self.userid = None
+        self._assignments: dict[int, dict] = {}
+
+    def authenticate(self, username: str, password: str):
+        resp = self.session.post(urljoin(self.base, "login/token.php"), data={
+            "username": username,
+            "password": password,
+            "service": self.settings.MOODLE_WS_SERVICE,
+        }).json()
+        if "token" not in resp:
+            if resp.get("errorcode") == "invalidlogin":
+                raise InvalidCredentialsError(f"[{username}] Неверный логин или пароль")
+            raise MoodleWsError(resp.get("error") or resp)
+        self.token = resp["token"]
+        self.userid = self.call("core_webservice_get_site_info")["userid"]
+
+    def call(self, wsfunction: str, **params):
+        data = {"wstoken": self.token, "wsfunction": wsfunction, "moodlewsrestformat": "json"}
+        data.update(self._flatten(params))
+        resp = self.session.post(urljoin(self.base, "webservice/rest/server.php"), data=data).json()
+        if isinstance(resp, dict) and resp.get("exception"):
+            raise MoodleWsError(f"{wsfunction}: {resp.get('message', resp['errorcode'])}")
+        return resp
+
+    @staticmethod
+    def _flatten(params: dict, prefix: str = "") -> dict:
+        """
+        REST‑протокол Moodle ждёт массивы в виде courseids[0]=1&courseids[1]=2.
+        """
+        out = {}
+        for key, value in params.items():
+            name = f"{prefix}[{key}]" if prefix else str(key)
+            if isinstance(value, dict):
+                out.update(MoodleWsClient._flatten(value, name))
+            elif isinstance(value, (list, tuple)):
+                out.update(MoodleWsClient._flatten(dict(enumerate(value)), name))
+            else:
+                out[name] = value
+        return out
+
+    def get_courses(self) -> list[dict]:
+        return self.call("core_enrol_get_users_courses", userid=self.userid)
+
+    def get_course_grades(self) -> dict[str, str]:
+        data = self.call("gradereport_overview_get_course_grades", userid=self.userid)
+        return {str(g["courseid"]): g.get("grade", "") for g in data.get("grades", [])}
+
+    def course_link(self, course_id: int) -> str:
+        return urljoin(self.settings.BASE_URL, f"/lms/course/view.php?id={course_id}")
+
+    def task_link(self, cmid: int) -> str:
+        return urljoin(self.settings.BASE_URL, f"/lms/mod/assign/view.php?id={cmid}")
+
+    def load_assignments(self, course_ids: list[int]) -> list[dict]:
+        """
+        Задания курсов одним запросом; запоминает соответствие cmid → задание.
+        """
+        data = self.call("mod_assign_get_assignments", courseids=course_ids)
+        for course in data.get("courses", []):
+            for assign in course.get("assignments", []):
+                assign["course_name"] = course.get("fullname", "")
+                self._assignments[assign["cmid"]] = assign
+        return data.get("courses", [])
+
+    def get_deadlines(self) -> dict[str, dict]:
+        """
+        Даты открытия и сдачи всех заданий пользователя одним вызовом mod_assign_get_assignments.
+        """
+        deadlines = {}
+        for course in self.load_assignments([c["id"] for c in self.get_courses()]):
+            for assign in course.get("assignments", []):
+                deadlines[self.task_link(assign["cmid"])] = {
+                    "open_date": format_ts(assign.get("allowsubmissionsfromdate")),
+                    "due_date": format_ts(assign.get("duedate")),
+                }
+        return deadlines
+
+    def get_status(self, task_link: str) -> dict:
+        """
+        Поля таблицы состояния одного задания, как на странице mod/assign/view.php.
+        """
+        cmid = int(parse_qs(urlsplit(task_link).query)["id"][0])
+        if cmid not in self._assignments:
+            self.load_assignments([c["id"] for c in self.get_courses()])
+        if cmid not in self._assignments:
+            raise MoodleWsError(f"Задание {task_link} не найдено среди курсов пользователя")
+        assign = self._assignments[cmid]
+        status = self.call("mod_assign_get_submission_status", assignid=assign["id"])
+        return self._status_fields(assign, status)
+
+    def parse_assignments_from_course(self, course_link: str) -> list[list[str]]:
+        course_id = int(parse_qs(urlsplit(course_link).query)["id"][0])
+        result = []
+        for course in self.load_assignments([course_id]):
+            for assign in course.get("assignments", []):
+                stat = self.get_status(self.task_link(assign["cmid"]))
+                result.append([
+                    course.get("fullname", "") or f"Курс {course_id}",
+                    assign.get("name", "").strip() or "Без названия",
+                    lms_date(assign.get("allowsubmissionsfromdate")),
+                    lms_date(assign.get("duedate")),
+                    self.task_link(assign["cmid"]),
+                    stat["Состояние ответа на задание"],
+                    stat["Состояние оценивания"],
+                    stat["Оставшееся время"],
+                    stat["Последнее изменение"],
+                    stat["Файлы"],
+                    self.course_link(course_id), "",
+                ])
+        return result
+
+    def _status_fields(self, assign: dict, status: dict) -> dict:
+        attempt = status.get("lastattempt") or {}
+        submission = attempt.get("submission") or attempt.get("teamsubmission") or {}
+        sub_status = submission.get("status", "new")
+        # Порядок как на странице: сначала файлы из описания задания, потом файлы ответа
+        files = [f["fileurl"] for f in assign.get("introattachments", [])]
+        files += [
+            f["fileurl"]
+            for plugin in submission.get("plugins", [])
+            for area in plugin.get("fileareas", [])
+            for f in area.get("files", [])
+        ]
+        # Ссылки webservice/pluginfile.php открываются только с токеном, в браузере — обычные
+        files = [url.replace("/webservice/pluginfile.php", "/pluginfile.php") for url in files]
+
+        return {
+            "Состояние ответа на задание": RESPONSE_STATUS.get(sub_status, sub_status),
+            "Состояние оценивания": GRADE_STATUS.get(attempt.get("gradingstatus"), "—"),
+            "Оставшееся время": self._time_left(assign.get("duedate"), sub_status),
+            "Последнее изменение": lms_date(submission.get("timemodified"), "—"),
+            "Файлы": ", ".join(files),
+        }
+
+    @staticmethod
+    def _time_left(duedate, sub_status: str) -> str:
+        if not duedate or sub_status == "submitted":
+            return "—"
+        seconds = int(duedate - datetime.now(tz=MOSCOW_TZ).timestamp())
+        if seconds <= 0:
+            return OVERDUE.format(format_duration(-seconds))
+        return format_duration(seconds)
+
+    def close(self):
+        self.session.close()
@@ -1,11 +1,12 @@
 import json
 import logging
-import subprocess
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit, parse_qs
 
-from bs4 import BeautifulSoup
+import requests
 from selenium import webdriver
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.options import Options
@@ -17,6 +18,20 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 from core.db import insert
+from core.models.lms_sessions import (get_session, save_session, drop_session,
+                                     get_timetable_request, save_timetable_request)
+from services.course_cache import CourseListCache
+from services.adaptive_limiter import get_limiter
+from services.browser_manager import get_manager
+from services.circuit_breaker import LmsUnavailableError, get_breaker
+from services.driver_pool import get_pool
+from services.encryption import EncryptionService
+from services.extractors import SCRIPTS, extract_html, parse_html, use_parser
+from services.lms_http import (InvalidCredentialsError, LmsHttpPool, LmsHttpSession, LmsPageIncomplete,
+                               LmsSessionExpired)
+from services.moodle_ws import MOSCOW_TZ, MoodleWsClient
+from services.timetable_cache import TimetableCache
+from utils.date_utils import format_ts, time_left
 
 logger = logging.getLogger(__name__)
 
@@ -42,14 +57,408 @@ OPTION_PREFS = {
     "profile.managed_default_content_settings.images": 2,
     "profile.managed_default_content_settings.stylesheets": 2,
 }
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "expires")
+BLOCKED_URLS = ["*.ttf", "*.svg", "*.css", "*.png", "*.jpg", "*.jpeg", "*.gif", "*.woff2", "*.mp4"]
+ENROLLED_COURSES_METHOD = "core_course_get_enrolled_courses_by_timeline_classification"
+ACTION_EVENTS_METHOD = "core_calendar_get_action_events_by_timesort"
+SESSKEY_SCRIPT = "return (window.M && M.cfg) ? M.cfg.sesskey : null;"
+# Длительность загрузки страницы текущей вкладки по Navigation Timing, с (null — нет данных)
+NAVIGATION_TIME_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+return nav && nav.duration ? nav.duration / 1000 : null;
+"""
+# id пользователя LMS из ссылки на его профиль в меню пользователя
+PROFILE_ID_RE = re.compile(r"/user/profile\.php\?id=(\d+)")
+PROFILE_ID_SCRIPT = """
+const a = document.querySelector("a[href*='/user/profile.php?id=']");
+return a ? new URL(a.href).searchParams.get('id') : null;
+"""
+AJAX_FETCH_SCRIPT = """
+const [url, body, done] = arguments;
+fetch(url, {method: 'POST', credentials: 'same-origin', headers: {'Content-Type': 'application/json'}, body})
+    .then(r => r.json())
+    .then(done)
+    .catch(e => done({fetch_error: String(e)}));
+"""
+
+# Перехватчик fetch/XHR для страницы расписания: запоминает запросы getProcessor и ответы на них
+GET_PROCESSOR_HOOK = """
+(() => {
+    window.__getProcessor = [];
+    // Тело запроса так, чтобы его можно было повторить: строка как есть, URLSearchParams — строкой
+    // (тип application/x-www-form-urlencoded браузер ставит сам), FormData — списком полей для multipart
+    const keep = (url, method, body, headers, text) => {
+        const req = {url, method, body: null, form: null, unsupported: null, headers, text};
+        if (typeof body === 'string') {
+            req.body = body;
+        } else if (body instanceof URLSearchParams) {
+            req.body = body.toString();
+            if (!Object.keys(headers).some(h => h.toLowerCase() === 'content-type')) {
+                headers['Content-Type'] = 'application/x-www-form-urlencoded;charset=UTF-8';
+            }
+        } else if (body instanceof FormData) {
+            req.form = [...body.entries()].filter(([, v]) => typeof v === 'string');
+        } else if (body != null) {
+            req.unsupported = Object.prototype.toString.call(body);
+        }
+        window.__getProcessor.push(req);
+    };
+
+    const origFetch = window.fetch;
+    window.fetch = function (input, init = {}) {
+        const request = input instanceof Request ? input : null;
+        // у fetch(Request) тело внутри запроса: читаем копию до отправки
+        const body = request && init.body === undefined ? request.clone().text() : Promise.resolve(init.body);
+        const promise = origFetch.apply(this, arguments);
+        const url = new URL(request ? request.url : String(input), location.href).href;
+        if (url.includes('getProcessor')) {
+            const method = init.method || (request ? request.method : 'GET');
+            const headers = Object.fromEntries(new Headers(init.headers || (request ? request.headers : {})));
+            Promise.all([body, promise.then(r => r.clone().text())])
+                .then(([b, text]) => keep(url, method, b, headers, text))
+                .catch(() => {});
+        }
+        return promise;
+    };
+
+    const {open, send, setRequestHeader} = XMLHttpRequest.prototype;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        this.__req = {method, url: new URL(url, location.href).href, headers: {}};
+        return open.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.setRequestHeader = function (name, value) {
+        if (this.__req) this.__req.headers[name] = value;
+        return setRequestHeader.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function (body) {
+        const req = this.__req;
+        if (req && req.url.includes('getProcessor')) {
+            this.addEventListener('load', () => keep(req.url, req.method, body, req.headers, this.responseText));
+        }
+        return send.apply(this, arguments);
+    };
+})();
+"""
 
 
 class Scraper:
     def __init__(self, settings):
         self.settings = settings
+        self.http = LmsHttpPool(settings)
+        self.browsers = get_manager(settings)
+        self.limiter = get_limiter(settings)
+        self.breaker = get_breaker(settings, self.probe_lms)
+        self.pool = get_pool(
+            settings,
+            lambda: self.init_driver(eager=settings.BROWSER_CONTEXTS > 0),
+            self.quit_and_clear,
+            self._block_resources,
+            self.browsers.lease,
+        )
+        self.encryptor = EncryptionService(settings.ENCRYPTION_KEY)
+        self.courses = CourseListCache(self, settings.COURSES_CACHE_TTL)
+        self.timetables = TimetableCache(self, settings.TIMETABLE_CACHE_TTL)
+        use_parser(settings.HTML_PARSER)
+
+    def backends_for(self, operation: str) -> list[str]:
+        """
+        Порядок бэкендов для операции: выбранный в настройках, затем selenium как запасной.
+        Для расписания http — это повтор пойманного запроса getProcessor.
+        """
+        preferred = self.settings.SCRAPER_BACKENDS.get(operation, "selenium")
+        return [preferred] if preferred == "selenium" else [preferred, "selenium"]
+
+    def open_client(self, backend: str, operation: str = "pool"):
+        if backend == "http":
+            return self.http.session()
+        if backend == "ws":
+            return MoodleWsClient(self.http.session(), self.settings)
+        return self.pool.acquire(operation)
+
+    def close_client(self, client):
+        if isinstance(client, (LmsHttpSession, MoodleWsClient)):
+            client.close()
+        else:
+            self.pool.release(client)
+
+    def run(self, operation: str, job):
+        """
+        Выполняет job(client) на первом сработавшем бэкенде операции.
+        Клиент закрывается в любом случае.
+        """
+        if not self.breaker.allow():
+            raise LmsUnavailableError(f"[{operation}] LMS недоступна, обращение пропущено")
+        last_error = None
+        for backend in self.backends_for(operation):
+            client = self.open_client(backend, operation)
+            try:
+                return job(client)
+            except (InvalidCredentialsError, LmsUnavailableError):
+                raise
+            except Exception as e:
+                last_error = e
+                logger.warning(f"[{operation}] Бэкенд {backend} не справился: {e}")
+            finally:
+                self.close_client(client)
+        raise last_error
+
+    def login_client(self, operation: str, username: str, password: str):
+        """
+        Как run(), но клиент остаётся открытым: возвращает клиент первого бэкенда операции,
+        на котором удался вход. Закрывает его (close_client) вызывающий.
+        """
+        if not self.breaker.allow():
+            raise LmsUnavailableError(f"[{operation}] LMS недоступна, обращение пропущено")
+        last_error = None
+        for backend in self.backends_for(operation):
+            client = self.open_client(backend, operation)
+            try:
+                self.login(client, username, password)
+                return client
+            except Exception as e:
+                self.close_client(client)
+                if isinstance(e, (InvalidCredentialsError, LmsUnavailableError)):
+                    raise
+                last_error = e
+                logger.warning(f"[{operation}] Бэкенд {backend} не справился: {e}")
+        raise last_error
+
+    def fetch_page(self, client, url: str, locator: tuple[str, str], timeout: int = 20, kind: str | None = None):
+        """
+        Загружает страницу LMS и возвращает её HTML.
+        Для WebDriver дополнительно ждёт появления locator.
+        С kind возвращает не HTML, а данные извлекателя services.extractors:
+        в браузере они собираются скриптом, без передачи page_source.
+        Задержка и исход загрузки уходят в адаптивный ограничитель проверок.
+        """
+        started = time.perf_counter()
+        try:
+            data = self._load_page(client, url, locator, timeout, kind)
+        except Exception as e:
+            self._page_done(started, e)
+            raise
+        self._page_done(started)
+        return data
+
+    def _page_done(self, started: float, error: Exception | None = None, latency: float | None = None):
+        """
+        Задержка и исход загрузки страницы — в адаптивный лимит и предохранитель LMS.
+        latency — если задержку измерил сам браузер; иначе считается от started.
+        """
+        self.limiter.record(time.perf_counter() - started if latency is None else latency, ok=error is None)
+        self.breaker.record(error)
+
+    def probe_lms(self) -> bool:
+        """
+        Дешёвая проверка, что LMS отвечает: страница входа без логина с коротким таймаутом.
+        """
+        session = self.http.session()
+        try:
+            resp = session.session.get(self.settings.LOGIN_PAGE, timeout=self.settings.BREAKER_PROBE_TIMEOUT)
+            return resp.status_code < 500
+        except requests.RequestException:
+            return False
+        finally:
+            session.close()
+
+    def _load_page(self, client, url: str, locator: tuple[str, str], timeout: int, kind: str | None):
+        if isinstance(client, LmsHttpSession):
+            html = client.get(url).text
+            return extract_html(kind, html) if kind else html
+        client.get(url)
+        try:
+            WebDriverWait(client, timeout).until(EC.presence_of_element_located(locator))
+        except TimeoutException as e:
+            raise self._wait_error(client, url, e) from e
+        return self._page_data(client, kind)
+
+    @staticmethod
+    def _wait_error(driver, url: str, error: TimeoutException) -> Exception:
+        """
+        Чем на самом деле был таймаут ожидания элемента: страница загрузилась без него
+        (LmsPageIncomplete) или нас отправили на вход (LmsSessionExpired) — это не сбой LMS,
+        и предохранитель их не считает. Иначе — сам таймаут.
+        """
+        try:
+            if "/login/" in driver.current_url:
+                return LmsSessionExpired(f"Сессия LMS недействительна: {url}")
+            if driver.execute_script("return document.readyState") == "complete":
+                return LmsPageIncomplete(f"На странице нет ожидаемого элемента: {url}")
+        except Exception:
+            pass
+        return error
+
+    @staticmethod
+    def _page_data(driver, kind: str | None):
+        return driver.execute_script(SCRIPTS[kind]) if kind else driver.page_source
+
+    def fetch_pages(self, client, urls: list[str], locator: tuple[str, str], timeout: int = 20,
+                    kind: str | None = None) -> list:
+        """
+        Загружает несколько страниц одной сессией, до PAGE_FETCH_CONCURRENCY одновременно:
+        параллельными запросами для HTTP или в нескольких вкладках браузера.
+        Порядок результатов совпадает с urls, None — страница не загрузилась.
+        kind — как в fetch_page.
+        """
+        k = max(1, self.settings.PAGE_FETCH_CONCURRENCY)
+        if isinstance(client, LmsHttpSession):
+            def _get(url):
+                try:
+                    return self.fetch_page(client, url, locator, timeout, kind)
+                except Exception as e:
+                    logger.warning(f"Не удалось загрузить {url}: {e}")
+                    return None
+
+            with ThreadPoolExecutor(max_workers=k) as executor:
+                return list(executor.map(_get, urls))
+
+        if k == 1 or len(urls) == 1:
+            pages = []
+            for url in urls:
+                try:
+                    pages.append(self.fetch_page(client, url, locator, timeout, kind))
+                except Exception as e:
+                    logger.warning(f"Не удалось загрузить {url}: {e}")
+                    pages.append(None)
+            return pages
+
+        driver = client
+        main = driver.current_window_handle
+        pages = []
+        for start in range(0, len(urls), k):
+            handles = []
+            try:
+                # Запускаем загрузку пачки во вкладках, не дожидаясь каждой
+                for url in urls[start:start + k]:
+                    driver.switch_to.new_window("tab")
+                    self._block_resources(driver)
+                    driver.execute_script("window.location.href = arguments[0];", url)
+                    handles.append((driver.current_window_handle, time.perf_counter()))
+                for (handle, started), url in zip(handles, urls[start:start + k]):
+                    driver.switch_to.window(handle)
+                    try:
+                        WebDriverWait(driver, timeout).until(
+                            lambda d: d.execute_script("return document.readyState") == "complete"
+                                      and d.find_elements(*locator)
+                        )
+                        pages.append(self._page_data(driver, kind))
+                        # Вкладки ждём по очереди, поэтому задержку берём из Navigation Timing самой вкладки,
+                        # а не от started: иначе в неё вошло бы ожидание предыдущих вкладок
+                        self._page_done(started, latency=driver.execute_script(NAVIGATION_TIME_SCRIPT))
+                    except Exception as e:
+                        if isinstance(e, TimeoutException):
+                            e = self._wait_error(driver, url, e)
+                        logger.warning(f"Не удалось загрузить {url}: {e}")
+                        self._page_done(started, e)
+                        pages.append(None)
+            finally:
+                for handle, _ in handles:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                driver.switch_to.window(main)
+        return pages
+
+    def fetch_task_statuses(self, client, task_links: list[str]) -> list[dict | None]:
+        """
+        Строки таблиц состояния заданий {заголовок: значение} с параллельной загрузкой страниц.
+        None — страница не загрузилась или таблицы на ней нет.
+        """
+        if isinstance(client, MoodleWsClient):
+            return [client.get_status(link) for link in task_links]
+        pages = self.fetch_pages(client, task_links, (By.CLASS_NAME, "generaltable"), kind="status")
+        return [self.status_rows(data) if data is not None else None for data in pages]
+
+    def fetch_task_pages(self, client, task_links: list[str]) -> list:
+        """
+        Как fetch_task_statuses, но страницы HTTP‑бэкенда не разбираются: возвращается их HTML
+        для extractors.parse_statuses (конвейер проверки разбирает его в пуле процессов).
+        Для браузера и веб‑сервиса — уже готовые {заголовок: значение}; None — страница не загрузилась.
+        """
+        if isinstance(client, LmsHttpSession):
+            return self.fetch_pages(client, task_links, (By.CLASS_NAME, "generaltable"))
+        return self.fetch_task_statuses(client, task_links)
 
     @staticmethod
-    def init_driver(load_css=False) -> webdriver.Chrome:
+    def status_rows(data: dict) -> dict | None:
+        """
+        Данные извлекателя «status» → {заголовок: значение} (get_text(strip=True)).
+        """
+        if data["rows"] is None:
+            return None
+        return {row[0]: row[1] for row in data["rows"]}
+
+    def ajax_call(self, client, methodname: str, args: dict):
+        """
+        Вызов внутреннего AJAX‑сервиса Moodle (lib/ajax/service.php) с sesskey текущей сессии.
+        В браузере запрос делается через fetch() страницы, чтобы ушли её куки.
+        """
+        url = urljoin(self.settings.BASE_URL, "/lms/lib/ajax/service.php")
+        payload = [{"index": 0, "methodname": methodname, "args": args}]
+        if isinstance(client, LmsHttpSession):
+            if not client.sesskey:
+                client.get(self.settings.SESSION_PROBE_PAGE)
+            resp = client.post(url, params={"sesskey": client.sesskey, "info": methodname}, json=payload)
+            reply = resp.json()[0]
+        else:
+            sesskey = self._driver_sesskey(client)
+            reply = client.execute_async_script(
+                AJAX_FETCH_SCRIPT, f"{url}?sesskey={sesskey}&info={methodname}", json.dumps(payload)
+            )
+            if "fetch_error" in reply:
+                raise RuntimeError(f"{methodname}: {reply['fetch_error']}")
+            reply = reply[0]
+        if reply.get("error"):
+            raise RuntimeError(f"{methodname}: {reply.get('exception', {}).get('message', reply)}")
+        return reply["data"]
+
+    def _driver_sesskey(self, driver) -> str:
+        """
+        sesskey из M.cfg текущей страницы LMS; если мы не на ней — открываем лёгкую страницу.
+        """
+        sesskey = driver.execute_script(SESSKEY_SCRIPT)
+        if not sesskey:
+            driver.get(self.settings.SESSION_PROBE_PAGE)
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "page-content")))
+            sesskey = driver.execute_script(SESSKEY_SCRIPT)
+        if not sesskey:
+            raise RuntimeError("Не удалось получить sesskey")
+        return sesskey
+
+    def fetch_deadlines(self, client) -> dict[str, dict]:
+        """
+        Сроки сдачи всех заданий пользователя за один запрос
+        (core_calendar_get_action_events_by_timesort): {task_link: {"due_date": ...}}.
+        """
+        if isinstance(client, MoodleWsClient):
+            return client.get_deadlines()
+
+        deadlines = {}
+        after = 0
+        while True:
+            data = self.ajax_call(client, ACTION_EVENTS_METHOD, {
+                "timesortfrom": int(time.time()) - self.settings.DEADLINE_LOOKBACK_DAYS * 86400,
+                "limitnum": 50,
+                "aftereventid": after,
+            })
+            events = data.get("events", [])
+            for event in events:
+                if event.get("modulename") != "assign" or event.get("eventtype") != "due":
+                    continue
+                cmid = self.course_id(event.get("url", ""))
+                if cmid:
+                    task_link = urljoin(self.settings.BASE_URL, f"/lms/mod/assign/view.php?id={cmid}")
+                    deadlines[task_link] = {"due_date": format_ts(event.get("timesort"))}
+            if len(events) < 50:
+                return deadlines
+            after = events[-1]["id"]
+
+    def init_driver(self, load_css=False, owner: str = "pool", eager: bool = False) -> webdriver.Chrome:
+        """
+        Все браузеры создаются через BrowserManager: у каждого свой профиль и учёт процессов.
+        Драйверы пула живут долго, остальные считаются утёкшими после BROWSER_LEAK_AGE.
+        eager — не ждать картинок и подресурсов при get(): общий браузер с контекстами
+        держит lock на время загрузки, и другие пользователи ждут меньше.
+        """
         insert("data", {"type": "driver_init", "timestamp": time.time()})
         options = Options()
         options.add_argument("--headless")
@@ -58,29 +467,202 @@ class Scraper:
             options.add_argument(f)
 
         options.add_experimental_option("prefs", OPTION_PREFS)
-        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        if eager:
+            options.page_load_strategy = "eager"
 
-        driver = webdriver.Chrome(options=options)
+        driver = self.browsers.create(options, owner, persistent=owner == "pool")
 
         if not load_css:
-            driver.execute_cdp_cmd("Network.enable", {})
-            driver.execute_cdp_cmd("Network.setBlockedURLs", {
-                "urls": ["*.ttf", "*.svg", "*.css", "*.png", "*.jpg", "*.jpeg", "*.gif", "*.woff2", "*.mp4"]
-            })
+            Scraper._block_resources(driver)
 
         return driver
 
-    def login(self, driver, username: str, password: str):
+    @staticmethod
+    def _block_resources(driver):
+        """
+        Блокировка ресурсов действует на текущую вкладку, поэтому вызывается и для новых вкладок.
+        """
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+
+    def login(self, client, username: str, password: str, reuse_session: bool = True):
+        """
+        Вход в LMS. reuse_session — сначала попробовать сохранённые куки логина:
+        только для паролей, которые уже проверены и лежат в БД (плановая проверка, команды).
+        Для /login (reuse_session=False) пароль всегда проверяет LMS, а неверный пароль
+        не трогает чужую сохранённую сессию.
+        """
+        if isinstance(client, MoodleWsClient):
+            insert("data", {"type": "authorization", "timestamp": time.time()})
+            client.authenticate(username, password)
+            insert("data", {"type": "success_authorization", "timestamp": time.time()})
+            return
+        if reuse_session and self.restore_session(client, username):
+            return
+
         insert("data", {"type": "authorization", "timestamp": time.time()})
+        try:
+            if isinstance(client, LmsHttpSession):
+                self._http_login(client, username, password)
+            else:
+                self._driver_login(client, username, password)
+        except InvalidCredentialsError:
+            if reuse_session:
+                # сохранённый пароль устарел — его сессии тоже больше не доверяем
+                drop_session(username)
+            raise
+        logger.info(f"[{username}] Успешно вошли в систему")
+        insert("data", {"type": "success_authorization", "timestamp": time.time()})
+        self.store_session(client, username)
+
+    def restore_session(self, client, username: str) -> bool:
+        """
+        Подставляет сохранённые куки пользователя и проверяет, что сессия ещё жива.
+        При неудаче куки удаляются, и нужен полный вход.
+        """
+        token = get_session(username)
+        if not token:
+            return False
+        try:
+            self._set_cookies(client, json.loads(self.encryptor.decrypt(token)))
+            if self._probe_session(client):
+                logger.info(f"[{username}] Используем сохранённую сессию")
+                insert("data", {"type": "session_reuse", "timestamp": time.time()})
+                return True
+        except Exception as e:
+            logger.warning(f"[{username}] Не удалось восстановить сессию: {e}")
+        logger.info(f"[{username}] Сохранённая сессия недействительна")
+        drop_session(username)
+        self._clear_cookies(client)
+        return False
+
+    def export_session(self, client) -> list[dict]:
+        """
+        Куки LMS и lk.mtuci.ru из клиента — чтобы перенести сессию в другой клиент (import_session).
+        """
+        return [c for c in self._get_cookies(client) if c["domain"].endswith(self.settings.COOKIE_DOMAIN)]
+
+    def import_session(self, client, cookies: list[dict], user_id: str | None) -> bool:
+        """
+        Заменяет куки клиента сессией из export_session и проверяет, что LMS видит в ней
+        того же пользователя user_id (session_user владельца). Если нет — куки очищаются
+        и возвращается False: грузить страницы от чужого имени нельзя.
+        """
+        self._clear_cookies(client)
+        try:
+            self._set_cookies(client, cookies)
+            if user_id is not None and self.session_user(client) == user_id:
+                return True
+        except Exception as e:
+            logger.warning(f"Не удалось перенести сессию LMS: {e}")
+        self._clear_cookies(client)
+        return False
+
+    def session_user(self, client) -> str | None:
+        """
+        id пользователя LMS, от имени которого работает сессия клиента, или None, если сессия не действует.
+        """
+        if isinstance(client, LmsHttpSession):
+            try:
+                match = PROFILE_ID_RE.search(client.get(self.settings.SESSION_PROBE_PAGE).text)
+            except LmsSessionExpired:
+                return None
+            return match.group(1) if match else None
+        client.get(self.settings.SESSION_PROBE_PAGE)
+        if "/login/" in client.current_url:
+            return None
+        WebDriverWait(client, 10).until(EC.presence_of_element_located((By.ID, "page-content")))
+        return client.execute_script(PROFILE_ID_SCRIPT)
+
+    def store_session(self, client, username: str):
+        """
+        Сохраняет куки LMS и lk.mtuci.ru в зашифрованном виде со сроком LMS_SESSION_TTL.
+        """
+        try:
+            token = self.encryptor.encrypt(json.dumps(self.export_session(client)))
+            save_session(username, token, time.time() + self.settings.LMS_SESSION_TTL)
+        except Exception as e:
+            logger.warning(f"[{username}] Не удалось сохранить сессию: {e}")
+
+    def _probe_session(self, client) -> bool:
+        if isinstance(client, LmsHttpSession):
+            try:
+                client.get(self.settings.SESSION_PROBE_PAGE)
+                return True
+            except LmsSessionExpired:
+                return False
+        client.get(self.settings.SESSION_PROBE_PAGE)
+        if "/login/" in client.current_url:
+            return False
+        WebDriverWait(client, 10).until(EC.presence_of_element_located((By.ID, "page-content")))
+        return True
+
+    @staticmethod
+    def _get_cookies(client) -> list[dict]:
+        if isinstance(client, LmsHttpSession):
+            return [
+                {
+                    "name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+                    "secure": c.secure, "httpOnly": c.has_nonstandard_attr("HttpOnly"), "expires": c.expires or -1
+                }
+                for c in client.session.cookies
+            ]
+        cookies = client.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        return [{k: c[k] for k in COOKIE_FIELDS if k in c} for c in cookies]
+
+    @staticmethod
+    def _set_cookies(client, cookies: list[dict]):
+        if isinstance(client, LmsHttpSession):
+            for c in cookies:
+                expires = c.get("expires", -1)
+                client.session.cookies.set(
+                    c["name"], c["value"], domain=c["domain"], path=c.get("path", "/"),
+                    secure=c.get("secure", False), expires=int(expires) if expires > 0 else None
+                )
+            return
+        client.execute_cdp_cmd("Network.setCookies", {
+            "cookies": [{k: v for k, v in c.items() if not (k == "expires" and v <= 0)} for c in cookies]
+        })
+
+    @staticmethod
+    def _clear_cookies(client):
+        if isinstance(client, LmsHttpSession):
+            client.session.cookies.clear()
+        else:
+            client.execute_cdp_cmd("Network.clearBrowserCookies", {})
+
+    def _http_login(self, client: LmsHttpSession, username: str, password: str):
+        """
+        POST формы входа Moodle вместе с logintoken.
+        """
+        logger.info(f"[{username}] Входим в систему (http)")
+        soup = parse_html(client.get(self.settings.LOGIN_PAGE).text)
+        form = soup.select_one("form#login") or soup.find("form")
+        token = soup.select_one("input[name='logintoken']")
+        data = {"username": username, "password": password}
+        if token:
+            data["logintoken"] = token.get("value", "")
+        action = urljoin(client.current_url, form["action"]) if form and form.get("action") else self.settings.LOGIN_PAGE
+
+        soup = parse_html(client.post(action, data=data).text)
+        if soup.select_one("#loginerrormessage, .loginerrors"):
+            raise InvalidCredentialsError(f"[{username}] Неверный логин или пароль")
+        if not soup.select_one("#page-content") or soup.select_one("input[name='logintoken']"):
+            raise RuntimeError(f"[{username}] Не удалось войти через http")
+
+    def _driver_login(self, driver, username: str, password: str):
         wait = WebDriverWait(driver, 10)
         driver.get(self.settings.LOGIN_PAGE)
         wait.until(EC.presence_of_element_located((By.NAME, "username")))
         logger.info(f"[{username}] Входим в систему")
         driver.find_element(By.NAME, "username").send_keys(username)
         driver.find_element(By.NAME, "password").send_keys(password + Keys.RETURN)
+        # Неверный пароль Moodle показывает на той же странице входа — не ждём ухода с неё до таймаута
+        errors = (By.CSS_SELECTOR, "#loginerrormessage, .loginerrors")
+        wait.until(lambda d: "/login/" not in d.current_url or d.find_elements(*errors))
+        if driver.find_elements(*errors):
+            raise InvalidCredentialsError(f"[{username}] Неверный логин или пароль")
         wait.until(EC.presence_of_element_located((By.ID, "page-content")))
-        logger.info(f"[{username}] Успешно вошли в систему")
-        insert("data", {"type": "success_authorization", "timestamp": time.time()})
 
     @staticmethod
     def _dom_click(driver: WebDriver, element):
@@ -178,9 +760,24 @@ class Scraper:
 
         raise RuntimeError("Не удалось переключить страницу в режим «Карточка»")
 
-    def get_course_links(self, driver) -> list[str]:
+    def get_course_links(self, client) -> list[str]:
+        """
+        Список ссылок на курсы пользователя.
+        Берём его из AJAX‑сервиса Moodle; разбор карточек на «Мои курсы» — запасной путь для браузера.
+        """
+        if isinstance(client, MoodleWsClient):
+            return [client.course_link(c["id"]) for c in client.get_courses()]
+        try:
+            return self._ajax_course_links(client)
+        except Exception as e:
+            if isinstance(client, LmsHttpSession):
+                raise
+            logger.warning(f"AJAX‑список курсов недоступен, разбираем карточки: {e}")
+        return self._card_course_links(client)
+
+    def _card_course_links(self, driver) -> list[str]:
         """
-        Парсим страницу «Мои курсы» и возвращаем список ссылок.
+        Парсим страницу «Мои курсы» в режиме «Карточка» и возвращаем список ссылок.
         """
         wait = WebDriverWait(driver, 20)
         driver.get(self.settings.MY_COURSES_PAGE)
@@ -192,22 +789,35 @@ class Scraper:
 
         # Ждём загрузки карточек
         wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.col.d-flex.px-0.mb-2")))
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        links = []
-
-        for div in soup.select("div.col.d-flex.px-0.mb-2"):
-            a = div.find("a", href=True)
-            if a:
-                href = a["href"]
-                links.append(href if href.startswith("http") else urljoin(self.settings.BASE_URL, href))
+        return [
+            href if href.startswith("http") else urljoin(self.settings.BASE_URL, href)
+            for href in driver.execute_script(SCRIPTS["cards"])
+        ]
 
-        return links
+    def _ajax_course_links(self, client) -> list[str]:
+        """
+        Тот же список, что и блок «Мои курсы», напрямую из AJAX‑сервиса:
+        без переключения вида, ящика и ожидания отрисовки карточек.
+        """
+        data = self.ajax_call(client, ENROLLED_COURSES_METHOD, {
+            "offset": 0,
+            "limit": 0,
+            "classification": "all",
+            "sort": "fullname",
+            "customfieldname": "",
+            "customfieldvalue": "",
+        })
+        return [
+            c["viewurl"] if c["viewurl"].startswith("http") else urljoin(self.settings.BASE_URL, c["viewurl"])
+            for c in data.get("courses", []) if c.get("viewurl")
+        ]
 
-    def select_option(self, driver, container_id: str, visible_text: str):
+    def select_option(self, driver, container_id: str, visible_text: str, screenshot: bool = True):
         """
         В контейнере с id=container_id находим .switch-btn, .selector-btn или .groups-btn
         с текстом visible_text и кликаем по нему.
         Спецобработка для группы: идём в #groups_container.
+        screenshot — сохранять ли снимок страницы при ошибке.
         """
         try:
             wait = WebDriverWait(driver, 10)
@@ -233,34 +843,90 @@ class Scraper:
             time.sleep(0.1)
             btn.click()
             time.sleep(0.2)
-        except Exception as e:
-            driver.save_screenshot(f"error_{int(time.time())}.png")
+        except Exception:
+            if screenshot:
+                driver.save_screenshot(f"error_{int(time.time())}.png")
             raise
 
-    def get_timetable(self, driver, login, pwd):
+    def get_timetable(self, client, login, pwd):
         """
-        Возвращает «сырое» JSON‑тело ответа от /ilk/x/getProcessor
+        Расписание пользователя из ответа /ilk/x/getProcessor.
+        HTTP‑клиент повторяет запрос, пойманный в браузере, с сохранёнными куки lk.mtuci.ru;
+        браузер открывает страницу расписания и ловит запрос перехватчиком fetch/XHR.
         """
-        self.login(driver, login, pwd)
-        driver.get(self.settings.TIME_TABLE_URL)
-        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.schedule-lessons")))
+        if isinstance(client, MoodleWsClient):
+            client = client.session
+        if isinstance(client, LmsHttpSession):
+            return self.parse_api_timetable(self._http_timetable(client, login))
 
-        data = None
-        for entry in driver.get_log("performance"):
-            msg = json.loads(entry["message"])["message"]
-            if msg.get("method") == "Network.responseReceived":
-                url = msg["params"]["response"]["url"]
-                if "getProcessor" in url:
-                    req_id = msg["params"]["requestId"]
-                    body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": req_id})
-                    data = json.loads(body["body"])
-                    break
+        self.login(client, login, pwd)
+        hook = client.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": GET_PROCESSOR_HOOK})
+        try:
+            client.get(self.settings.TIME_TABLE_URL)
+            WebDriverWait(client, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.schedule-lessons")))
+            captured = client.execute_script("return window.__getProcessor || [];")
+        finally:
+            client.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": hook["identifier"]})
 
-        if data is None:
+        responses = []
+        for item in captured:
+            try:
+                responses.append((item, json.loads(item["text"])))
+            except (TypeError, ValueError):
+                continue
+        if not responses:
             raise RuntimeError("Не удалось поймать ответ getProcessor")
+        # getProcessor вызывается и для других данных кабинета — берём ответ с расписанием
+        request, data = next((r for r in responses if self._has_timetable(r[1])), responses[0])
 
+        # После захода на lk.mtuci.ru в браузере есть и SSO‑куки личного кабинета
+        self.store_session(client, login)
+        if request.get("unsupported"):
+            logger.warning(f"[{login}] Тело запроса getProcessor ({request['unsupported']}) не повторить без браузера")
+        else:
+            save_timetable_request(login, {
+                "url": request["url"],
+                "method": request["method"],
+                "body": request["body"],
+                "form": request.get("form"),
+                "headers": {k: v for k, v in request["headers"].items() if k.lower() == "content-type"},
+                "captured_on": datetime.now(tz=MOSCOW_TZ).strftime("%Y-%m-%d"),
+            })
         return self.parse_api_timetable(data)
 
+    def _http_timetable(self, client: LmsHttpSession, login: str) -> dict:
+        """
+        Прямой запрос getProcessor без браузера. Запрос берётся сегодняшний:
+        тело задаёт период расписания, и вчерашнее показало бы прошлую неделю.
+        """
+        token = get_session(login)
+        request = get_timetable_request(login)
+        if not token or not request or request.get("captured_on") != datetime.now(tz=MOSCOW_TZ).strftime("%Y-%m-%d"):
+            raise RuntimeError("Нет сохранённого запроса расписания")
+        self._set_cookies(client, json.loads(self.encryptor.decrypt(token)))
+        form = request.get("form")
+        resp = client.session.request(
+            request["method"], request["url"],
+            # FormData браузер отправлял как multipart/form-data; заголовок с boundary requests ставит сам
+            data=None if form else request["body"],
+            files=[(name, (None, value)) for name, value in form] if form else None,
+            headers={} if form else request["headers"],
+            timeout=client.timeout
+        )
+        resp.raise_for_status()
+        try:
+            data = resp.json()
+        except ValueError:
+            raise RuntimeError("getProcessor вернул не JSON — сессия lk.mtuci.ru устарела")
+        if not self._has_timetable(data):
+            raise RuntimeError("В ответе getProcessor нет расписания")
+        logger.info(f"[{login}] Расписание получено без браузера")
+        return data
+
+    @staticmethod
+    def _has_timetable(data) -> bool:
+        return isinstance(data, dict) and "МассивРасписания" in ((data.get("data") or {}).get("Ответ") or {})
+
     @staticmethod
     def parse_api_timetable(api_json: dict) -> list[dict]:
         """
@@ -309,7 +975,7 @@ class Scraper:
         return out
 
     def get_groups(self, level: str, form: str, faculty: str, course: str) -> list[str]:
-        driver = self.init_driver(True)
+        driver = self.init_driver(True, owner="groups")
         wait = WebDriverWait(driver, 10)
         try:
             driver.get(self.settings.TIME_TABLE_URL)
@@ -323,64 +989,80 @@ class Scraper:
             except Exception:
                 pass
 
-            self.select_option(driver, "levels", level)
-            self.select_option(driver, "forms", form)
-            self.select_option(driver, "faculties", faculty)
-            self.select_option(driver, "courses", course)
+            # Группы собирает пакетный обход каталога: снимки ошибок по сотням сочетаний не нужны
+            self.select_option(driver, "levels", level, screenshot=False)
+            self.select_option(driver, "forms", form, screenshot=False)
+            self.select_option(driver, "faculties", faculty, screenshot=False)
+            self.select_option(driver, "courses", course, screenshot=False)
 
             wait.until(EC.presence_of_element_located((By.ID, "groups_container")))
-            html = driver.page_source
-            return self.list_groups_from_html(html)
+            return driver.execute_script(SCRIPTS["groups"])
         finally:
             self.quit_and_clear(driver)
 
     def list_groups_from_html(self, html: str) -> list[str]:
-        soup = BeautifulSoup(html, "html.parser")
-        box = soup.select_one("#groups_container")
-        if not box:
-            return []
-        return [div.get_text(strip=True) for div in box.select(".groups-btn")]
+        return extract_html("groups", html)
 
-    def parse_assignments_from_course(self, driver, course_link: str) -> list[list[str]]:
+    def parse_assignments_from_course(self, client, course_link: str, known: dict | None = None) -> list[list]:
         """
         Разбор задач одного курса
-        Возвращает список необработанных записей
+        Возвращает список необработанных записей (+ ссылка на курс и строка индекса заданий).
+        known — сохранённые задачи {task_link: Task}: если строка задания в индексе курса
+        не изменилась, страница задания не загружается, а статусы берутся из БД.
         """
-        wait = WebDriverWait(driver, 20)
+        if isinstance(client, MoodleWsClient):
+            return client.parse_assignments_from_course(course_link)
         full = course_link if course_link.startswith("http") else urljoin(self.settings.BASE_URL, course_link)
-        driver.get(full)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1.h2.mb-0")))
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        course_name = (soup.select_one("h1.h2.mb-0").text.strip()
-                       if soup.select_one("h1.h2.mb-0")
-                       else f"Курс {full.split('id=')[-1]}")
+        course = self.fetch_page(client, full, (By.CSS_SELECTOR, "h1.h2.mb-0"), kind="course")
+        course_name = course["name"] or f"Курс {full.split('id=')[-1]}"
+
+        known = known or {}
+        index = {}
+        if known:
+            try:
+                index = self.fetch_course_index(client, full)
+            except Exception as e:
+                logger.warning(f"Не удалось загрузить индекс заданий {full}: {e}")
 
         result = []
-        for assign in soup.select("li.modtype_assign"):
-            block = assign.select_one("div.activity-item")
-            if not block:
-                continue
-            name = block.get("data-activityname", "").strip() or "Без названия"
-            link_tag = block.select_one("a.aalink[href]")
-            if not link_tag:
-                continue
-            href = link_tag["href"]
+        for activity in course["activities"]:
+            name = activity["name"] or "Без названия"
+            href = activity["href"]
             task_link = href if href.startswith("http") else urljoin(self.settings.BASE_URL, href)
 
             open_date = "не указано"
             due_date = "не указано"
-            for d in block.select("div.activity-dates div"):
-                t = d.get_text(strip=True)
+            for t in activity["dates"]:
                 if t.startswith("Открыто с"):
                     open_date = t.replace("Открыто с:", "").strip()
                 elif t.startswith("Срок сдачи"):
                     due_date = t.replace("Срок сдачи:", "").strip()
 
-            driver.get(task_link)
-            wait.until(EC.presence_of_element_located((By.CLASS_NAME, "generaltable")))
-            task_soup = BeautifulSoup(driver.page_source, "html.parser")
+            signature = index.get(task_link, "")
+            task = known.get(task_link)
+            if signature and task and task.index_status == signature and task.response_status:
+                result.append([
+                    course_name, name, open_date, due_date, task_link,
+                    task.response_status,
+                    task.grade_status,
+                    self._reused_time_left(task),
+                    task.last_change,
+                    "",
+                    full, signature,
+                ])
+                continue
+
+            result.append([course_name, name, open_date, due_date, task_link, None, None, None, None, None,
+                           full, signature])
+
+        # Страницы заданий, которых нет в БД или которые изменились, грузим пачками
+        pending = [item for item in result if item[5] is None]
+        pages = self.fetch_pages(client, [item[4] for item in pending], (By.CLASS_NAME, "generaltable"),
+                                 kind="status")
+        for item, data in zip(pending, pages):
+            if data is None:
+                raise RuntimeError(f"Не удалось загрузить задание {item[4]}")
 
-            status_table = task_soup.select_one("table.generaltable.table-bordered")
             stat = {
                 "Состояние ответа на задание": "—",
                 "Состояние оценивания": "—",
@@ -388,37 +1070,64 @@ class Scraper:
                 "Последнее изменение": "—",
                 "Файлы": ""
             }
-            if status_table:
-                for row in status_table.select("tr"):
-                    th = row.find("th");
-                    td = row.find("td")
-                    if th and td and th.text.strip() in stat:
-                        stat[th.text.strip()] = td.text.strip()
-
-            files = [a["href"] for a in task_soup.select("a[href*='pluginfile.php']")]
-            stat["Файлы"] = ", ".join(files)
-
-            result.append([
-                course_name, name, open_date, due_date, task_link,
+            for _, _, th, td in data["rows"] or []:
+                if th in stat:
+                    stat[th] = td
+            stat["Файлы"] = ", ".join(data["files"])
+
+            item[5:10] = [
                 stat["Состояние ответа на задание"],
                 stat["Состояние оценивания"],
                 stat["Оставшееся время"],
                 stat["Последнее изменение"],
                 stat["Файлы"],
-            ])
+            ]
 
         return result
 
+    @staticmethod
+    def _reused_time_left(task) -> str:
+        """
+        «Оставшееся время» для задачи из БД: пока срок не прошёл и ответа нет — пересчитываем.
+        """
+        left = time_left(task.due_date)
+        if left and "Отправлено" not in task.response_status:
+            return left
+        return task.time_left
+
+    def fetch_course_index(self, client, course_link: str) -> dict[str, str]:
+        """
+        Одна страница mod/assign/index.php на курс: {task_link: строка задания в таблице}.
+        Строка включает срок, состояние ответа и оценку, поэтому её изменение
+        означает, что страницу задания нужно перечитать.
+        """
+        if isinstance(client, MoodleWsClient):
+            return {}
+        url = urljoin(self.settings.BASE_URL, f"/lms/mod/assign/index.php?id={self.course_id(course_link)}")
+        return {
+            href if href.startswith("http") else urljoin(self.settings.BASE_URL, href): row
+            for href, row in self.fetch_page(client, url, (By.ID, "region-main"), kind="index")
+        }
+
+    def fetch_grades_overview(self, client) -> dict[str, str]:
+        """
+        Отчёт «Обзор оценок» одним запросом: {id курса: итоговая оценка}.
+        """
+        if isinstance(client, MoodleWsClient):
+            return client.get_course_grades()
+        url = urljoin(self.settings.BASE_URL, "/lms/grade/report/overview/index.php")
+        return {
+            self.course_id(href): grade
+            for href, grade in self.fetch_page(client, url, (By.ID, "region-main"), kind="overview")
+        }
+
+    @staticmethod
+    def course_id(course_link: str) -> str:
+        return parse_qs(urlsplit(course_link).query).get("id", [""])[0]
+
     def quit_and_clear(self, driver):
         """
-        Фикс того, что хромиум занимает ~3гб на диске просто потому что существует
+        Фикс того, что хромиум занимает ~3гб на диске просто потому что существует:
+        менеджер закрывает браузер, добивает его процессы и удаляет профиль целиком.
         """
-        try:
-            # Очистить кеш и куки
-            # subprocess.check_call(["pip", "cache", "purge"])
-            driver.execute_cdp_cmd('Network.clearBrowserCache', {})
-            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
-        except Exception:
-            pass
-        finally:
-            driver.quit()
+        self.browsers.quit(driver)
@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from core.db import insert
+from core.models.timetables import get_group_timetable, get_fetched_at, save_group_timetable
+from core.models.users import custom_select as user_select
+from services.moodle_ws import MOSCOW_TZ
+
+logger = logging.getLogger(__name__)
+
+# Ключ кеша для значения period= в TIME_TABLE_URL: какой период lk.mtuci.ru отдаёт сейчас
+PERIOD_KEYS = {
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m",
+}
+
+
+class TimetableCache:
+    """
+    Расписание одно на всю группу, поэтому хранится по (группа, период) с TTL,
+    где период — тот, что загружает TIME_TABLE_URL (по умолчанию месяц).
+    Промах загружает расписание один раз от имени спросившего студента,
+    ночью prefetch() заранее обновляет расписания всех известных групп.
+    Без группы у пользователя расписание грузится лично для него, как раньше.
+    """
+
+    def __init__(self, scraper, ttl: int):
+        self.scraper = scraper
+        self.ttl = ttl
+        self._locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    def period(self) -> str:
+        """
+        Текущий период из period= в TIME_TABLE_URL: 2025-02 для month, 2025-W07 для week.
+        """
+        kind = parse_qs(urlsplit(self.scraper.settings.TIME_TABLE_URL).query).get("period", ["week"])[0]
+        return datetime.now(tz=MOSCOW_TZ).strftime(PERIOD_KEYS.get(kind, PERIOD_KEYS["week"]))
+
+    def get(self, user) -> list[dict]:
+        if not user.group:
+            return self.fetch(user)
+        period = self.period()
+        cached = get_group_timetable(user.group, period)
+        if cached is None:
+            # Одновременные промахи одной группы ждут первую загрузку, а не дублируют её
+            with self._group_lock(user.group):
+                cached = get_group_timetable(user.group, period)
+                if cached is None:
+                    cached = self.fetch(user)
+                    save_group_timetable(user.group, period, cached, time.time() + self.ttl)
+                    return cached
+        insert("data", {"type": "timetable_cache_hit", "timestamp": time.time()})
+        return cached
+
+    def fetch(self, user) -> list[dict]:
+        pwd = self.scraper.encryptor.decrypt(user.mtuci_password)
+        return self.scraper.run(
+            "timetable",
+            lambda client: self.scraper.get_timetable(client, user.mtuci_login, pwd)
+        )
+
+    def prefetch(self) -> int:
+        """
+        Обновляет расписания групп, загруженные больше половины TTL назад.
+        Для каждой группы пробует её студентов по очереди до первой удачной загрузки.
+        Возвращает число обновлённых групп.
+        """
+        members = defaultdict(list)
+        for user in user_select({"group": {"$nin": [None, ""]}, "mtuci_login": {"$nin": [None, ""]}}):
+            members[user.group].append(user)
+
+        period = self.period()
+        updated = 0
+        for group, users in members.items():
+            if time.time() - get_fetched_at(group, period) < self.ttl / 2:
+                continue
+            for user in users:
+                try:
+                    with self._group_lock(group):
+                        entries = self.fetch(user)
+                        save_group_timetable(group, period, entries, time.time() + self.ttl)
+                    updated += 1
+                    break
+                except Exception as e:
+                    logger.warning(f"[{user.telegram_id}] Не удалось обновить расписание группы {group}: {e}")
+        logger.info(f"Расписания обновлены для {updated} из {len(members)} групп")
+        return updated
+
+    def _group_lock(self, group: str) -> threading.Lock:
+        with self._lock:
+            return self._locks[group]
@@ -0,0 +1,262 @@
+import json
+import threading
+import time
+from datetime import datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from zoneinfo import ZoneInfo
+
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+DAY = 24 * 3600
+
+USERNAME = "student"
+PASSWORD = "secret"
+TOKEN = "fake-ws-token"
+USER_ID = 7
+COURSE_ID = 101
+COURSE_NAME = "Программирование на Python"
+
+WEEKDAYS = ["понедельник", "вторник", "среда", "четверг", "пятница", "суббота", "воскресенье"]
+MONTHS = ["января", "февраля", "марта", "апреля", "мая", "июня",
+          "июля", "августа", "сентября", "октября", "ноября", "декабря"]
+# Строки таблицы состояния, как их показывает LMS
+RESPONSE_TEXT = {
+    "new": "Ответы на задание еще не представлены",
+    "submitted": "Отправлено для оценивания",
+    "draft": "Черновик (не отправлено)",
+}
+GRADE_TEXT = {
+    "graded": "Оценено",
+    "notgraded": "Не оценено",
+}
+
+
+def lms_date(ts: int) -> str:
+    """
+    Дата так, как её пишет LMS: 'среда, 7 мая 2025, 14:00' (день без ведущего нуля).
+    """
+    dt = datetime.fromtimestamp(ts, tz=MOSCOW_TZ)
+    return f"{WEEKDAYS[dt.weekday()]}, {dt.day} {MONTHS[dt.month - 1]} {dt.year}, {dt:%H:%M}"
+
+
+def lms_time_left(ts: int) -> str:
+    """
+    «Оставшееся время» до срока или, после срока, отметка о просрочке.
+    """
+    seconds = int(ts - time.time())
+    if seconds <= 0:
+        seconds = -seconds
+        return f"Задание просрочено на: {seconds // 86400} дн. {seconds % 86400 // 3600} час."
+    return f"{seconds // 86400} дн. {seconds % 86400 // 3600} час."
+
+
+def make_assignments(base: str) -> list[dict]:
+    """
+    Задания курса: по одному на каждое состояние ответа и оценивания, плюс просроченное.
+    Срок считается от текущего времени с запасом в полчаса до смены часа в «Оставшемся времени».
+    """
+    now = int(time.time())
+    files = f"{base}/lms/pluginfile.php/{{}}/{{}}"
+    ws_files = f"{base}/lms/webservice/pluginfile.php/{{}}/{{}}"
+    return [
+        {
+            "id": 1, "cmid": 501, "name": "Лабораторная работа 1",
+            "allowsubmissionsfromdate": now - 10 * DAY, "duedate": now + 3 * DAY + 5 * 3600 + 1800,
+            "intro": [(ws_files.format(11, "task1.pdf"), files.format(11, "task1.pdf"))],
+            "status": "new", "grading": "notgraded", "timemodified": 0, "files": [],
+        },
+        {
+            "id": 2, "cmid": 502, "name": "Лабораторная работа 2",
+            "allowsubmissionsfromdate": now - 20 * DAY, "duedate": 0,
+            "intro": [],
+            "status": "submitted", "grading": "graded", "timemodified": now - 5 * DAY,
+            "files": [(ws_files.format(12, "report.docx"), files.format(12, "report.docx"))],
+        },
+        {
+            "id": 3, "cmid": 503, "name": "Курсовой проект",
+            "allowsubmissionsfromdate": 0, "duedate": now + 10 * DAY + 1800,
+            "intro": [(ws_files.format(13, "requirements.pdf"), files.format(13, "requirements.pdf"))],
+            "status": "draft", "grading": "notgraded", "timemodified": now - 2 * DAY,
+            "files": [(ws_files.format(14, "draft.zip"), files.format(14, "draft.zip"))],
+        },
+        {
+            "id": 4, "cmid": 504, "name": "Реферат",
+            "allowsubmissionsfromdate": now - 30 * DAY, "duedate": now - 2 * DAY - 5 * 3600 - 1800,
+            "intro": [],
+            "status": "new", "grading": "notgraded", "timemodified": 0, "files": [],
+        },
+    ]
+
+
+class FakeMoodle:
+    """
+    Локальная LMS для тестов: веб‑сервис Moodle (login/token.php, webservice/rest/server.php)
+    и HTML‑страницы курса и заданий, построенные из одних и тех же данных.
+    start() поднимает сервер на свободном порту в отдельном потоке, url — его адрес.
+    """
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self.assignments = make_assignments(self.url)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/lms/course/view.php" and query.get("id") == str(COURSE_ID):
+                    return self._send("text/html; charset=utf-8", fake.course_page())
+                if url.path == "/lms/mod/assign/view.php":
+                    assign = fake.by_cmid(int(query.get("id", 0)))
+                    if assign:
+                        return self._send("text/html; charset=utf-8", fake.assign_page(assign))
+                self.send_error(404)
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                if url.path == "/lms/login/token.php":
+                    return self._json(fake.token(form))
+                if url.path == "/lms/webservice/rest/server.php":
+                    return self._json(fake.call(form))
+                self.send_error(404)
+
+            def _json(self, data):
+                self._send("application/json", json.dumps(data, ensure_ascii=False))
+
+            def _send(self, content_type: str, body: str):
+                raw = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        return Handler
+
+    def by_cmid(self, cmid: int) -> dict | None:
+        return next((a for a in self.assignments if a["cmid"] == cmid), None)
+
+    # --- веб‑сервис ---
+
+    @staticmethod
+    def token(form: dict) -> dict:
+        if form.get("username") == USERNAME and form.get("password") == PASSWORD:
+            return {"token": TOKEN, "privatetoken": None}
+        return {"error": "Неверный логин или пароль, попробуйте заново.", "errorcode": "invalidlogin"}
+
+    def call(self, form: dict):
+        if form.get("wstoken") != TOKEN:
+            return {"exception": "moodle_exception", "errorcode": "invalidtoken", "message": "Invalid token"}
+        function = form.get("wsfunction")
+        if function == "core_webservice_get_site_info":
+            return {"userid": USER_ID, "username": USERNAME}
+        if function == "core_enrol_get_users_courses":
+            return [{"id": COURSE_ID, "fullname": COURSE_NAME, "shortname": "python"}]
+        if function == "gradereport_overview_get_course_grades":
+            return {"grades": [{"courseid": COURSE_ID, "grade": "85,00", "rawgrade": "85.00"}]}
+        if function == "mod_assign_get_assignments":
+            ids = [int(v) for k, v in form.items() if k.startswith("courseids[")]
+            courses = [{
+                "id": COURSE_ID,
+                "fullname": COURSE_NAME,
+                "assignments": [self.ws_assignment(a) for a in self.assignments],
+            }] if COURSE_ID in ids else []
+            return {"courses": courses, "warnings": []}
+        if function == "mod_assign_get_submission_status":
+            assign = next((a for a in self.assignments if a["id"] == int(form.get("assignid", 0))), None)
+            if assign:
+                return self.ws_status(assign)
+        return {"exception": "moodle_exception", "errorcode": "invalidrecord", "message": f"{function}: not found"}
+
+    @staticmethod
+    def ws_assignment(assign: dict) -> dict:
+        return {
+            "id": assign["id"],
+            "cmid": assign["cmid"],
+            "course": COURSE_ID,
+            "name": assign["name"],
+            "allowsubmissionsfromdate": assign["allowsubmissionsfromdate"],
+            "duedate": assign["duedate"],
+            "introattachments": [{"filename": ws.rsplit("/", 1)[-1], "fileurl": ws} for ws, _ in assign["intro"]],
+        }
+
+    @staticmethod
+    def ws_status(assign: dict) -> dict:
+        submission = {
+            "id": assign["id"] * 10,
+            "status": assign["status"],
+            "timemodified": assign["timemodified"],
+            "plugins": [{
+                "type": "file",
+                "fileareas": [{
+                    "area": "submission_files",
+                    "files": [{"filename": ws.rsplit("/", 1)[-1], "fileurl": ws} for ws, _ in assign["files"]],
+                }],
+            }],
+        }
+        return {"lastattempt": {"submission": submission, "gradingstatus": assign["grading"]}, "warnings": []}
+
+    # --- HTML ---
+
+    def course_page(self) -> str:
+        items = []
+        for assign in self.assignments:
+            dates = []
+            if assign["allowsubmissionsfromdate"]:
+                dates.append(f"<div><strong>Открыто с:</strong> {lms_date(assign['allowsubmissionsfromdate'])}</div>")
+            if assign["duedate"]:
+                dates.append(f"<div><strong>Срок сдачи:</strong> {lms_date(assign['duedate'])}</div>")
+            items.append(
+                f'<li class="activity assign modtype_assign" id="module-{assign["cmid"]}">'
+                f'<div class="activity-item" data-activityname="{escape(assign["name"])}">'
+                f'<a class="aalink stretched-link" href="/lms/mod/assign/view.php?id={assign["cmid"]}">'
+                f'<span class="instancename">{escape(assign["name"])}</span></a>'
+                f'<div class="activity-dates">{"".join(dates)}</div>'
+                f'</div></li>'
+            )
+        return (
+            f'<html><body><h1 class="h2 mb-0">{escape(COURSE_NAME)}</h1>'
+            f'<ul class="section">{"".join(items)}</ul></body></html>'
+        )
+
+    @staticmethod
+    def assign_page(assign: dict) -> str:
+        intro = "".join(f'<a href="{url}">{url.rsplit("/", 1)[-1]}</a>' for _, url in assign["intro"])
+        rows = [
+            ("Состояние ответа на задание", RESPONSE_TEXT[assign["status"]]),
+            ("Состояние оценивания", GRADE_TEXT[assign["grading"]]),
+        ]
+        if assign["duedate"]:
+            rows.append(("Последний срок сдачи", lms_date(assign["duedate"])))
+            if assign["status"] != "submitted":
+                rows.append(("Оставшееся время", lms_time_left(assign["duedate"])))
+        if assign["timemodified"]:
+            rows.append(("Последнее изменение", lms_date(assign["timemodified"])))
+        if assign["files"]:
+            links = "".join(f'<div><a href="{url}">{url.rsplit("/", 1)[-1]}</a></div>' for _, url in assign["files"])
+            rows.append(("Ответ в виде файла", links))
+        table = "".join(f'<tr><th class="cell c0">{th}</th><td class="cell c1">{td}</td></tr>' for th, td in rows)
+        return (
+            f'<html><body><h2>{escape(assign["name"])}</h2>'
+            f'<div class="activity-description">{intro}</div>'
+            f'<div class="submissionstatustable"><table class="generaltable table-bordered">{table}</table></div>'
+            f'</body></html>'
+        )
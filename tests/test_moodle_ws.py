@@ -0,0 +1,88 @@
+import os
+import unittest
+from types import SimpleNamespace
+
+os.environ.setdefault("DB_URL", "mongodb://127.0.0.1:27017")
+
+from services.adaptive_limiter import AdaptiveLimiter  # noqa: E402
+from services.circuit_breaker import LmsCircuitBreaker  # noqa: E402
+from services.lms_http import InvalidCredentialsError, LmsHttpPool  # noqa: E402
+from services.moodle_ws import GRADE_STATUS, RESPONSE_STATUS, MoodleWsClient, MoodleWsError  # noqa: E402
+from services.scraper import Scraper  # noqa: E402
+from tests.fake_moodle_ws import (COURSE_ID, GRADE_TEXT, PASSWORD, RESPONSE_TEXT, USERNAME,  # noqa: E402
+                                  FakeMoodle)
+
+
+class MoodleWsEquivalenceTest(unittest.TestCase):
+    """
+    Записи веб‑сервиса должны совпадать с записями, разобранными из HTML тех же заданий, строка в строку.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.lms = FakeMoodle().start()
+        cls.settings = SimpleNamespace(
+            BASE_URL=cls.lms.url,
+            MOODLE_WS_URL=f"{cls.lms.url}/lms/",
+            MOODLE_WS_SERVICE="moodle_mobile_app",
+            HTTP_POOL_SIZE=4,
+            HTTP_TIMEOUT=5,
+            PAGE_FETCH_CONCURRENCY=2,
+        )
+        cls.http = LmsHttpPool(cls.settings)
+        # Только то, что нужно разбору курса по HTTP: без браузеров, БД и шифрования
+        cls.scraper = Scraper.__new__(Scraper)
+        cls.scraper.settings = cls.settings
+        cls.scraper.limiter = AdaptiveLimiter(floor=1, ceiling=4, initial=2, target_latency=5, max_error_rate=0.5)
+        cls.scraper.breaker = LmsCircuitBreaker(lambda: True, timeouts=10, window=60, cooldown=60)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.lms.stop()
+
+    def ws_client(self) -> MoodleWsClient:
+        client = MoodleWsClient(self.http.session(), self.settings)
+        client.authenticate(USERNAME, PASSWORD)
+        return client
+
+    def test_course_records_match_html(self):
+        ws = self.ws_client()
+        link = ws.course_link(COURSE_ID)
+
+        html_records = self.scraper.parse_assignments_from_course(self.http.session(), link)
+        ws_records = self.scraper.parse_assignments_from_course(ws, link)
+
+        self.assertEqual(len(html_records), len(self.lms.assignments))
+        self.assertEqual(ws_records, html_records)
+
+    def test_get_status_matches_status_table(self):
+        ws = self.ws_client()
+        for assign in self.lms.assignments:
+            link = ws.task_link(assign["cmid"])
+            status = ws.get_status(link)
+            page = self.scraper.fetch_page(self.http.session(), link, ("class name", "generaltable"), kind="status")
+            rows = {th: td for _, _, th, td in page["rows"]}
+            self.assertEqual(status["Состояние ответа на задание"], rows["Состояние ответа на задание"])
+            self.assertEqual(status["Состояние оценивания"], rows["Состояние оценивания"])
+            self.assertEqual(status["Оставшееся время"], rows.get("Оставшееся время", "—"))
+            self.assertEqual(status["Файлы"], ", ".join(page["files"]))
+
+    def test_status_strings_match_lms(self):
+        for key, text in RESPONSE_TEXT.items():
+            self.assertEqual(RESPONSE_STATUS[key], text)
+        for key, text in GRADE_TEXT.items():
+            self.assertEqual(GRADE_STATUS[key], text)
+
+    def test_unknown_task(self):
+        ws = self.ws_client()
+        with self.assertRaises(MoodleWsError):
+            ws.get_status(ws.task_link(999))
+
+    def test_invalid_login(self):
+        client = MoodleWsClient(self.http.session(), self.settings)
+        with self.assertRaises(InvalidCredentialsError):
+            client.authenticate(USERNAME, "wrong")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 from datetime import datetime
+from zoneinfo import ZoneInfo
 
 MONTH_MAP = {
     "января": "январь", "февраля": "февраль", "марта": "март",
@@ -8,6 +9,9 @@ MONTH_MAP = {
 }
 
 
+WEEKDAYS = ["понедельник", "вторник", "среда", "четверг", "пятница", "суббота", "воскресенье"]
+
+
 def short_date(full_date: str) -> str:
     """
     Из 'среда, 12 мая 2025, 14:00' → '12.05.2025 14:00',
@@ -24,6 +28,58 @@ def short_date(full_date: str) -> str:
         return full_date
 
 
+def format_ts(ts, default: str = "не указано") -> str:
+    """
+    Unix‑время → '12.05.2025 14:00' по Москве (как после short_date).
+    """
+    if not ts:
+        return default
+    return datetime.fromtimestamp(ts, tz=ZoneInfo("Europe/Moscow")).strftime("%d.%m.%Y %H:%M")
+
+
+def lms_date(ts, default: str = "не указано") -> str:
+    """
+    Unix‑время → 'среда, 7 мая 2025, 14:00' по Москве — как дату пишет сама LMS.
+    """
+    if not ts:
+        return default
+    dt = datetime.fromtimestamp(ts, tz=ZoneInfo("Europe/Moscow"))
+    return f"{WEEKDAYS[dt.weekday()]}, {dt.day} {list(MONTH_MAP)[dt.month - 1]} {dt.year}, {dt:%H:%M}"
+
+
+def format_duration(seconds: int) -> str:
+    """
+    Секунды → '2 дн. 3 час.' (как интервалы в LMS).
+    """
+    return f"{seconds // 86400} дн. {seconds % 86400 // 3600} час."
+
+
+def due_timestamp(due_date: str) -> float | None:
+    """
+    Из '12.05.2025 14:00' (или полной даты LMS) → unix‑время по Москве,
+    или None, если срок не указан или не парсится.
+    """
+    try:
+        due = datetime.strptime(short_date(due_date), "%d.%m.%Y %H:%M").replace(tzinfo=ZoneInfo("Europe/Moscow"))
+    except (TypeError, ValueError):
+        return None
+    return due.timestamp()
+
+
+def time_left(due_date: str) -> str | None:
+    """
+    Из '12.05.2025 14:00' → '2 дн. 3 час.' (как «Оставшееся время» в LMS),
+    или None, если срок не указан, не парсится или уже прошёл.
+    """
+    due = due_timestamp(due_date)
+    if due is None:
+        return None
+    seconds = int(due - datetime.now(tz=ZoneInfo("Europe/Moscow")).timestamp())
+    if seconds <= 0:
+        return None
+    return format_duration(seconds)
+
+
 def compact_time(time_str: str) -> str:
     """
     Из '0 дн. - 2 час. осталось' → '2 ч'
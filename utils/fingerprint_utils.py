@@ -0,0 +1,24 @@
+import hashlib
+
+
+def course_fingerprint(overview_grade: str | None, tasks) -> str:
+    """
+    Отпечаток курса: строка из «Обзора оценок» + список заданий курса с их статусами в БД.
+    Меняется, если в LMS изменилась оценка за курс или в БД добавились/изменились задания.
+    """
+    parts = [overview_grade or ""]
+    parts += sorted(f"{t.task_link}\x1f{t.response_status}\x1f{t.grade_status}" for t in tasks)
+    return hashlib.sha1("\x1e".join(parts).encode()).hexdigest()
+
+
+# Строки таблицы состояния, которые меняются сами по себе и в отпечаток не входят
+VOLATILE_STATUS_ROWS = {"Оставшееся время"}
+
+
+def status_fingerprint(status: dict) -> str:
+    """
+    Отпечаток таблицы состояния задания {заголовок: значение} без «Оставшегося времени».
+    Совпал с сохранённым — на странице задания ничего не изменилось.
+    """
+    parts = sorted(f"{k}\x1f{v}" for k, v in status.items() if k not in VOLATILE_STATUS_ROWS)
+    return hashlib.sha1("\x1e".join(parts).encode()).hexdigest()
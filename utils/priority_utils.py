@@ -0,0 +1,40 @@
+from utils.date_utils import due_timestamp
+
+DAY = 24 * 3600
+WEEK = 7 * DAY
+
+
+def next_check_at(task, now: float, intervals: tuple[int, int, int]) -> float:
+    """
+    Когда снова открывать страницу задания, по его состоянию и сроку сдачи.
+    intervals — (warm, cool, idle) в секундах (Settings.TASK_CHECK_INTERVALS):
+      - каждую проверку: задание недавно менялось или до/после срока меньше суток;
+      - warm: ответ отправлен и ждёт оценки, или до срока (после срока) меньше недели;
+      - idle: оценено и закрыто, или срок прошёл больше недели назад;
+      - cool: всё остальное (срок далеко или не указан).
+    Дальний срок не даёт отложить проверку дальше, чем за сутки до него.
+    """
+    warm, cool, idle = intervals
+    due = due_timestamp(task.due_date)
+    grade = task.grade_status.split(":")[0].strip()
+    graded = grade == "Оценено"
+    submitted = "Отправлено" in task.response_status
+
+    if now - (task.last_updated or 0) < DAY:
+        return now
+    if due is not None and abs(due - now) < DAY:
+        return now
+    if submitted and not graded:
+        interval = warm
+    elif due is not None and due < now - WEEK:
+        interval = idle
+    elif graded and (due is None or due < now):
+        interval = idle
+    elif due is not None and due - now < WEEK:
+        interval = warm
+    else:
+        interval = cool
+
+    if due is not None and due - DAY > now:
+        return min(now + interval, due - DAY)
+    return now + interval
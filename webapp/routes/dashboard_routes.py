@@ -3,11 +3,12 @@ from collections import defaultdict
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash
 
 from core.db import get_collection
 from core.models.config import (get_bot_enabled, set_bot_enabled, get_maintenance_mode, set_maintenance_mode,
                                 get_scheduled_enabled, set_scheduled_enabled, get_schedule_interval)
+from services.browser_manager import current_manager
 from . import login_required
 
 logger = logging.getLogger(__name__)
@@ -25,12 +26,47 @@ def root():
         .sort("end_ts", -1) \
         .limit(1)
     last_schedule = None
+    concurrency_limit = page_latency = None
+    pipeline_stages = {}
     for d in last:
         moscow_time = datetime.fromtimestamp(d["end_ts"], tz=ZoneInfo("UTC")).astimezone(ZoneInfo("Europe/Moscow"))
         last_schedule = moscow_time.strftime("%d.%m.%Y %H:%M:%S")
+        concurrency_limit = d.get("concurrency_limit")
+        page_latency = round(d["page_latency"], 1) if d.get("page_latency") is not None else None
+        # этапы конвейера проверки: глубина очереди, обработано в минуту и невзятые страницы заданий (backlog fetch)
+        pipeline_stages = d.get("stages") or {}
+
+    # доля страниц заданий, где отпечаток статуса совпал и сравнение было пропущено
+    fp = next(data_coll.aggregate([
+        {"$match": {"type": "scheduled_check"}},
+        {"$group": {"_id": None, "checked": {"$sum": "$status_checked"}, "unchanged": {"$sum": "$status_unchanged"}}}
+    ]), None)
+    status_hit_rate = round(100 * fp["unchanged"] / fp["checked"]) if fp and fp["checked"] else None
+
+    # срабатывания предохранителя LMS и пропущенные из‑за него плановые проверки
+    circuit_opens = data_coll.count_documents({"type": "lms_circuit_open"})
+    skipped_checks = data_coll.count_documents({"type": "scheduled_check_skipped"})
+
+    # отставания непрерывной проверки от графика: сколько раз и насколько в последний раз
+    lag_reports = data_coll.count_documents({"type": "schedule_lag"})
+    last_lag = next(data_coll.find({"type": "schedule_lag"}).sort("timestamp", -1).limit(1), None)
+    schedule_lag = round(last_lag["lag"]) if last_lag else None
 
     # статистика инициализаций драйвера
     driver_inits = data_coll.count_documents({"type": "driver_init"})
+    browsers = next(data_coll.aggregate([
+        {"$match": {"type": "driver_quit"}},
+        {"$group": {"_id": None, "rss": {"$avg": "$peak_rss"}, "disk": {"$avg": "$profile_size"}}}
+    ]), None)
+    browser_rss = round(browsers["rss"] / 2 ** 20) if browsers and browsers["rss"] else None
+    browser_disk = round(browsers["disk"] / 2 ** 20) if browsers and browsers["disk"] else None
+
+    # живые браузеры сейчас: сколько, возраст старшего (мин) и суммарный пиковый RSS (МБ)
+    # менеджер здесь не создаётся: он есть, только если процесс уже запускал браузеры
+    manager = current_manager()
+    live_browsers = manager.stats() if manager else []
+    oldest_browser = round(max(b["age"] for b in live_browsers) / 60) if live_browsers else None
+    live_browser_rss = round(sum(b["peak_rss"] for b in live_browsers) / 2 ** 20) if live_browsers else None
 
     # статистика новых пользователей
     new_users = data_coll.count_documents({"type": "new_user"})
@@ -38,6 +74,7 @@ def root():
     # статистика авторизаций
     authorizations = data_coll.count_documents({"type": "authorization"})
     success_authorization = data_coll.count_documents({"type": "success_authorization"})
+    session_reuses = data_coll.count_documents({"type": "session_reuse"})
 
     # счётчики команд
     commands_data = defaultdict(lambda: {"count": 0, "last": None})
@@ -88,10 +125,24 @@ def root():
         "index.html",
         total_schedule=total_schedule,
         last_schedule=last_schedule,
+        concurrency_limit=concurrency_limit,
+        page_latency=page_latency,
+        pipeline_stages=pipeline_stages,
+        circuit_opens=circuit_opens,
+        skipped_checks=skipped_checks,
+        lag_reports=lag_reports,
+        schedule_lag=schedule_lag,
         driver_inits=driver_inits,
+        browser_rss=browser_rss,
+        browser_disk=browser_disk,
+        live_browsers=len(live_browsers),
+        oldest_browser=oldest_browser,
+        live_browser_rss=live_browser_rss,
         new_users=new_users,
         authorizations=authorizations,
         success_authorizations=success_authorization,
+        session_reuses=session_reuses,
+        status_hit_rate=status_hit_rate,
         commands_data=commands_data,
         command_stats=command_stats,
         bot_enabled=get_bot_enabled(),
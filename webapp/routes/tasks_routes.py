@@ -52,6 +52,10 @@ def update_task(task_id):
         task.response_status = new_resp
     if new_grade is not None:
         task.grade_status = new_grade
+    if new_resp is not None or new_grade is not None:
+        # статус правили вручную — следующая проверка должна сравнить его с LMS заново
+        task.status_fingerprint = ""
+        task.next_check_at = 0
 
     flash('Статус задачи обновлён', 'success')
     return redirect(url_for('tasks.view_tasks', **request.args))
\ No newline at end of file
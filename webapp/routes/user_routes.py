@@ -4,6 +4,7 @@ import logging
 from flask import Blueprint, render_template, request, redirect, url_for, current_app, flash
 
 from core.models import users
+from core.models.groups import get_catalog
 from . import login_required
 
 logger = logging.getLogger(__name__)
@@ -17,7 +18,8 @@ def view_users():
     return render_template(
         "users.html",
         users_list=users_list,
-        courses_map=json.dumps(current_app.config["SETTINGS"].COURSES_MAP, ensure_ascii=False)
+        courses_map=json.dumps(current_app.config["SETTINGS"].COURSES_MAP, ensure_ascii=False),
+        groups_catalog=json.dumps(get_catalog(), ensure_ascii=False)
     )
 
 